@@ -1,11 +1,11 @@
+import argparse
 import asyncio
 import logging
 
 from pysesameos2.ble import CHBleManager
 
-# In order to understand the details of pysesameos2,
-# here we dare to show the detailed logs.
-logging.basicConfig(level=logging.DEBUG)
+# Pass `-v` to see the detailed logs of pysesameos2 during the scan.
+logging.basicConfig(level=logging.INFO)
 logging.getLogger("bleak").setLevel(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -36,4 +36,16 @@ async def connect(scan_duration: int = 15):
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        action="store_const",
+        dest="loglevel",
+        const=logging.DEBUG,
+        default=logging.INFO,
+    )
+    args = parser.parse_args()
+    logging.getLogger("pysesameos2").setLevel(level=args.loglevel)
+
     asyncio.run(connect())
@@ -2,9 +2,21 @@ from __future__ import annotations
 
 import argparse
 import asyncio
-import inspect
+import collections
+import functools
 import logging
-from typing import TYPE_CHECKING, Dict, Optional, Tuple, TypedDict, Union
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    NamedTuple,
+    Optional,
+    Tuple,
+    TypedDict,
+    Union,
+)
 
 import paho.mqtt.client as mqtt
 import yaml
@@ -14,6 +26,11 @@ from pysesameos2.chsesame2 import CHSesame2
 from pysesameos2.chsesamebot import CHSesameBot
 from pysesameos2.const import CHDeviceLoginStatus, CHSesame2Status
 
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeLoader  # type: ignore
+
 if TYPE_CHECKING:
     from paho.mqtt.client import MQTTMessage
 
@@ -22,9 +39,10 @@ logging.getLogger("bleak").setLevel(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-class DiscoveredSesameDevices(TypedDict):
-    device_obj: Union[CHSesame2, CHSesameBot]
+class DiscoveredSesameDevices(NamedTuple):
+    device: Union[CHSesame2, CHSesameBot]
     ble_uuid: str
+    status_topic: str
 
 
 class SesameDeviceConfig(TypedDict):
@@ -46,10 +64,29 @@ class Config(TypedDict):
 
 
 mqtt_client = mqtt.Client()
+ble_manager = CHBleManager()
 with open("config.yml", "r") as yml:
-    config: Config = yaml.safe_load(yml)
-cmd_queue: asyncio.Queue[Tuple[str, str]] = asyncio.Queue()
-connected_devices = None
+    config: Config = yaml.load(yml, Loader=SafeLoader)
+MQTT_HOST = config["mqtt"]["host"]
+MQTT_PORT = config["mqtt"]["port"]
+MQTT_USER = config["mqtt"]["username"]
+MQTT_PASS = config["mqtt"]["password"]
+SESAME_CFG = config["sesame"]
+PREFIX = config["mqtt"]["topic_prefix"]
+LWT_TOPIC = f"{PREFIX}/LWT"
+# Keyed by member name: the members of `CHSesame2Status` share their values.
+STATUS_PAYLOAD: Dict[str, bytes] = {
+    CHSesame2Status.Locked.name: b"LOCKED",
+    CHSesame2Status.Unlocked.name: b"UNLOCKED",
+}
+cmd_deque: Deque[Tuple[str, bytes]] = collections.deque()
+cmd_event = asyncio.Event()
+reconnect_queue: asyncio.Queue[str] = asyncio.Queue()
+reconnecting: Dict[str, asyncio.Task] = {}
+# Seconds to wait before retrying a reconnect that did not succeed.
+RECONNECT_RETRY_DELAY = 1.0
+connected_devices: Optional[Dict[str, DiscoveredSesameDevices]] = None
+event_loop: Optional[asyncio.AbstractEventLoop] = None
 
 
 async def connect_sesame(
@@ -63,9 +100,7 @@ async def connect_sesame(
     if not isinstance(p_key, str):
         raise TypeError("secret_key not provided")
 
-    blem = CHBleManager()
-
-    device = await blem.scan_by_address(
+    device = await ble_manager.scan_by_address(
         ble_device_identifier=ble_device_identifier, scan_duration=30
     )
     if device is None:
@@ -86,155 +121,267 @@ async def runner_connect_sesame(
     target_ble_uuid: Optional[str] = None,
 ) -> Dict[str, DiscoveredSesameDevices]:
     if target_ble_uuid is None:
-        target_devices = config["sesame"]
+        target_devices = SESAME_CFG
     else:
-        if target_ble_uuid not in config["sesame"]:
+        if target_ble_uuid not in SESAME_CFG:
             raise ValueError("Unknown BLE UUID.")
         else:
-            target_devices = {target_ble_uuid: config["sesame"][target_ble_uuid]}
-
-    pending_tasks = set()
+            target_devices = {target_ble_uuid: SESAME_CFG[target_ble_uuid]}
+
+    # Every task reports itself to `done_queue` as soon as it finishes, so we
+    # handle each completion (or retry) individually instead of re-scanning
+    # the whole set of pending tasks on every wakeup.
+    done_queue: asyncio.Queue[asyncio.Task] = asyncio.Queue()
+    task_to_uuid: Dict[asyncio.Task, str] = {}
+    remaining = 0
     for target_ble_uuid, sesame_config in target_devices.items():
-        logger.debug(
-            "Connect to the Sesame device: BLE UUID = {}".format(target_ble_uuid)
-        )
-        pending_tasks.add(
-            asyncio.create_task(connect_sesame(target_ble_uuid, **sesame_config))
-        )
+        logger.debug("Connect to the Sesame device: BLE UUID = %s", target_ble_uuid)
+        task = asyncio.create_task(connect_sesame(target_ble_uuid, **sesame_config))
+        task.add_done_callback(done_queue.put_nowait)
+        task_to_uuid[task] = target_ble_uuid
+        remaining += 1
 
     connected_devices: Dict[str, DiscoveredSesameDevices] = {}
-    while pending_tasks:
-        done_tasks, pending_tasks = await asyncio.wait(
-            pending_tasks, return_when=asyncio.FIRST_EXCEPTION
-        )
-        for task in done_tasks:
-            if task.exception():
-                ble_uuid = inspect.getargvalues(task.get_stack()[0]).locals[
-                    "ble_device_identifier"
-                ]
-                sesame_config = config["sesame"][ble_uuid]
-                pending_tasks.add(
-                    asyncio.create_task(connect_sesame(ble_uuid, **sesame_config))
+    while remaining:
+        task = await done_queue.get()
+        remaining -= 1
+        ble_uuid = task_to_uuid.pop(task)
+
+        if task.exception():
+            sesame_config = SESAME_CFG[ble_uuid]
+            retry_task = asyncio.create_task(connect_sesame(ble_uuid, **sesame_config))
+            retry_task.add_done_callback(done_queue.put_nowait)
+            task_to_uuid[retry_task] = ble_uuid
+            remaining += 1
+            logger.warning("Connection retry: BLE UUID = %s", ble_uuid)
+        else:
+            device = task.result()
+            assert isinstance(device, CHSesame2) or isinstance(device, CHSesameBot)
+
+            ble_adv = device.getAdvertisement()
+            if isinstance(ble_adv, BLEAdvertisement):
+                ble_uuid = ble_adv.getAddress()
+
+                assert isinstance(device.deviceId, str)
+
+                connected_devices[device.deviceId] = DiscoveredSesameDevices(
+                    device=device,
+                    ble_uuid=ble_uuid,
+                    status_topic=f"{PREFIX}/{device.deviceId}/status",
+                )
+                logger.info(
+                    "Connected: BLE UUID = %s, SESAME UUID = %s",
+                    ble_uuid,
+                    device.deviceId,
                 )
-                logger.warning("Connection retry: BLE UUID = {}".format(ble_uuid))
             else:
-                device = task.result()
-                assert isinstance(device, CHSesame2) or isinstance(device, CHSesameBot)
-
-                ble_adv = device.getAdvertisement()
-                if isinstance(ble_adv, BLEAdvertisement):
-                    ble_uuid = ble_adv.getAddress()
-
-                    assert isinstance(device.deviceId, str)
-
-                    connected_devices[device.deviceId] = {
-                        "device_obj": device,
-                        "ble_uuid": ble_uuid,
-                    }
-                    logger.info(
-                        "Connected: BLE UUID = {}, SESAME UUID = {}".format(
-                            ble_uuid, device.deviceId
-                        )
-                    )
-                else:
-                    logger.error(
-                        "Failed to get BLE advertisement: SESAME UUID = {}".format(
-                            device.deviceId
-                        )
-                    )
+                logger.error(
+                    "Failed to get BLE advertisement: SESAME UUID = %s",
+                    device.deviceId,
+                )
 
     return connected_devices
 
 
 def onSesameStateChanged(device: Union[CHSesame2, CHSesameBot]) -> None:
-    global mqtt_client, config
+    global mqtt_client, connected_devices, reconnect_queue
     logger.info(
-        "SESAME status changed: SESAME UUID={}, status={}".format(
-            device.deviceId, device.getDeviceStatus()
-        )
+        "SESAME status changed: SESAME UUID=%s, status=%s",
+        device.deviceId,
+        device.getDeviceStatus(),
     )
 
-    topic = "{}/{}/status".format(config["mqtt"]["topic_prefix"], device.deviceId)
-    payload = None
-    if device.getDeviceStatus() == CHSesame2Status.Locked:
-        payload = "LOCKED"
-    elif device.getDeviceStatus() == CHSesame2Status.Unlocked:
-        payload = "UNLOCKED"
+    # The callback also fires while the device is still connecting,
+    # i.e. before it has its entry (and cached topic) in `connected_devices`.
+    device_id = device.deviceId
+    entry = (
+        connected_devices.get(device_id)
+        if connected_devices and device_id is not None
+        else None
+    )
+    topic = (
+        entry.status_topic
+        if entry is not None
+        else f"{PREFIX}/{device.deviceId}/status"
+    )
+    payload = STATUS_PAYLOAD.get(device.getDeviceStatus().name)
+
+    if payload is not None:
+        logger.info("Publish a message: topic=%s, payload=%s", topic, payload)
+        mqtt_client.publish(topic, payload=payload, qos=0, retain=True)
+
+    # Only the device object we are currently holding can trigger a reconnect;
+    # a fresh object that is still connecting also reports `UnLogin` states.
+    if (
+        entry is not None
+        and entry.device is device
+        and device.getDeviceStatus().value == CHDeviceLoginStatus.UnLogin
+    ):
+        logger.error(
+            "Found disconnected device, retry: BLE UUID = %s, SESAME UUID = %s",
+            entry.ble_uuid,
+            device.deviceId,
+        )
+        reconnect_queue.put_nowait(entry.ble_uuid)
 
-    if payload:
-        logger.info("Publish a message: topic={}, payload={}".format(topic, payload))
-        mqtt_client.publish(topic, payload=payload, qos=1, retain=True)
 
+def onMQTTMessage(uuid: str, msg: MQTTMessage) -> None:
+    global cmd_deque, cmd_event, event_loop
 
-def onMQTTMessage(client, userdata, msg: MQTTMessage) -> None:
-    global cmd_queue
+    logger.info("Received a cmd message: topic=%s, payload=%s", msg.topic, msg.payload)
+    # `msg.payload` is already `bytes`, no need to decode it.
+    cmd = msg.payload
 
-    logger.info(
-        "Received a cmd message: topic={}, payload={}".format(msg.topic, msg.payload)
+    if cmd != b"LOCK" and cmd != b"UNLOCK":
+        # Raising here would kill paho's network thread, so just drop it.
+        logger.warning("Failed to parse command: %r", cmd)
+        return
+
+    # This callback is invoked on the network thread of paho-mqtt.
+    # `deque.append` is thread-safe by itself, only waking up the consumer
+    # has to go through the event loop.
+    if event_loop is not None:
+        cmd_deque.append((uuid, cmd))
+        event_loop.call_soon_threadsafe(cmd_event.set)
+
+
+def make_cmd_callback(uuid: str) -> Callable[[mqtt.Client, Any, MQTTMessage], None]:
+    """Bind a SESAME UUID to a callback for its own command topic."""
+
+    def on_cmd_message(client: mqtt.Client, userdata: Any, msg: MQTTMessage) -> None:
+        onMQTTMessage(uuid, msg)
+
+    return on_cmd_message
+
+
+def subscribe_cmd_topics(client: mqtt.Client) -> None:
+    """Subscribe to the command topic of every connected device at once."""
+    global connected_devices
+
+    if not connected_devices:
+        return
+
+    cmd_topics = [(f"{PREFIX}/{uuid}/cmd", 0) for uuid in list(connected_devices)]
+    logger.debug("Subscribe to the MQTT topics: %s", cmd_topics)
+    client.subscribe(cmd_topics)
+
+
+def onMQTTConnect(client: mqtt.Client, userdata: Any, flags: Any, rc: int) -> None:
+    if rc != 0:
+        logger.error("Failed to connect to the MQTT server: rc=%s", rc)
+        return
+
+    # paho does not restore subscriptions when it reconnects by itself,
+    # so they are sent again (with the availability) on every connection.
+    logger.debug("Publish a message: topic=%s, payload=online", LWT_TOPIC)
+    client.publish(LWT_TOPIC, payload="online", qos=1, retain=True)
+    subscribe_cmd_topics(client)
+
+
+def retry_reconnect(ble_uuid: str) -> None:
+    """Queue another reconnect after a short delay, as the polling loop did."""
+    global reconnect_queue
+
+    asyncio.get_running_loop().call_later(
+        RECONNECT_RETRY_DELAY, reconnect_queue.put_nowait, ble_uuid
     )
-    uuid = msg.topic.split("/")[1]
-    cmd = msg.payload.decode("utf-8")
 
-    if not isinstance(uuid, str):
-        raise TypeError("Failed to parse the device uuid from topic")
-    if cmd not in ["LOCK", "UNLOCK"]:
-        raise TypeError("Failed to parse command: {}".format(cmd))
 
-    if cmd == "LOCK" or cmd == "UNLOCK":
-        cmd_queue.put_nowait((uuid, cmd))
+def onReconnected(ble_uuid: str, task: asyncio.Task) -> None:
+    global connected_devices, reconnecting
+
+    reconnecting.pop(ble_uuid, None)
+    if task.cancelled():
+        return
+    if task.exception() is not None:
+        logger.error("Failed to reconnect, retry: BLE UUID = %s", ble_uuid)
+        retry_reconnect(ble_uuid)
+        return
+
+    new_connection = task.result()
+    if not new_connection:
+        logger.error("Failed to reconnect, retry: BLE UUID = %s", ble_uuid)
+        retry_reconnect(ble_uuid)
+        return
+
+    if connected_devices is not None:
+        connected_devices.update(new_connection)
+
+    # `onSesameStateChanged` ignores the new device until it is stored in
+    # `connected_devices`, so a drop in the meantime has to be caught here.
+    for sesame_uuid, entry in new_connection.items():
+        if entry.device.getDeviceStatus().value == CHDeviceLoginStatus.UnLogin:
+            logger.error(
+                "Found disconnected device, retry: BLE UUID = %s, SESAME UUID = %s",
+                entry.ble_uuid,
+                sesame_uuid,
+            )
+            retry_reconnect(ble_uuid)
+
+
+async def reconnect_worker() -> None:
+    global reconnect_queue, reconnecting
+
+    # Every disconnected device gets its own reconnect task, so that
+    # simultaneous disconnections share the scan window instead of
+    # being processed one after another.
+    while True:
+        ble_uuid = await reconnect_queue.get()
+        if ble_uuid in reconnecting:
+            continue
+
+        task = asyncio.create_task(runner_connect_sesame(ble_uuid))
+        task.add_done_callback(functools.partial(onReconnected, ble_uuid))
+        reconnecting[ble_uuid] = task
 
 
 async def runner():
-    global mqtt_client, config, cmd_queue, connected_devices
+    global mqtt_client, cmd_event, reconnect_queue, connected_devices, event_loop
 
-    cmd_queue = asyncio.Queue()
+    cmd_event = asyncio.Event()
+    reconnect_queue = asyncio.Queue()
+    event_loop = asyncio.get_running_loop()
 
-    lwt_topic = "{}/LWT".format(config["mqtt"]["topic_prefix"])
-    mqtt_client.will_set(lwt_topic, payload="offline", qos=1, retain=True)
-    mqtt_client.on_message = onMQTTMessage
-    mqtt_client.username_pw_set(config["mqtt"]["username"], config["mqtt"]["password"])
+    mqtt_client.will_set(LWT_TOPIC, payload="offline", qos=1, retain=True)
+    mqtt_client.username_pw_set(MQTT_USER, MQTT_PASS)
+    mqtt_client.on_connect = onMQTTConnect
 
-    logger.info("Connect to the MQTT server: {}".format(config["mqtt"]["host"]))
-    mqtt_client.connect(config["mqtt"]["host"], config["mqtt"]["port"])
-    cmd_topic = "{}/+/cmd".format(config["mqtt"]["topic_prefix"])
-    logger.debug("Subscribe to the MQTT topic: {}".format(cmd_topic))
-    mqtt_client.subscribe(cmd_topic, qos=0)
+    logger.info("Connect to the MQTT server: %s", MQTT_HOST)
+    mqtt_client.connect(MQTT_HOST, MQTT_PORT)
+    mqtt_client.loop_start()
 
     connected_devices = await runner_connect_sesame()
 
-    logger.debug("Publish a message: topic={}, payload=online".format(lwt_topic))
-    mqtt_client.publish(lwt_topic, payload="online", qos=1, retain=True)
+    # Every command topic is dispatched to a callback that already knows its
+    # SESAME UUID. The callbacks survive reconnections, the subscriptions
+    # are renewed by `onMQTTConnect`.
+    for uuid in connected_devices:
+        mqtt_client.message_callback_add(
+            f"{PREFIX}/{uuid}/cmd", make_cmd_callback(uuid)
+        )
+    # The first connection may have been made before any device was ready.
+    subscribe_cmd_topics(mqtt_client)
+
+    # Disconnections are reported by `onSesameStateChanged` through
+    # `reconnect_queue`, and handled in the background.
+    reconnect_task = asyncio.create_task(reconnect_worker())  # noqa: F841
 
+    # Nothing else needs to be polled here anymore, just wait for commands.
     while True:
-        for sesame_uuid, device in connected_devices.items():
-            if (
-                device["device_obj"].getDeviceStatus().value
-                == CHDeviceLoginStatus.UnLogin
-            ):
-                ble_uuid = device["ble_uuid"]
-                logger.error(
-                    "Found disconnected device, retry: BLE UUID = {}, SESAME UUID = {}".format(
-                        ble_uuid, sesame_uuid
-                    )
-                )
-                new_connection = await runner_connect_sesame(ble_uuid)
-                connected_devices[sesame_uuid] = new_connection[sesame_uuid]
+        await cmd_event.wait()
+        # Clear the flag before draining, a command that arrives in the
+        # meantime sets it again and is picked up in the next round.
+        cmd_event.clear()
 
-        try:
-            sesame_uuid, command = await asyncio.wait_for(cmd_queue.get(), timeout=1.0)
+        while cmd_deque:
+            sesame_uuid, command = cmd_deque.popleft()
             if sesame_uuid in connected_devices:
-                if command == "LOCK":
-                    logger.info("Execute locking: SESAME UUID = {}".format(sesame_uuid))
-                    await connected_devices[sesame_uuid]["device_obj"].lock()
-                elif command == "UNLOCK":
-                    logger.info(
-                        "Execute unlocking: SESAME UUID = {}".format(sesame_uuid)
-                    )
-                    await connected_devices[sesame_uuid]["device_obj"].unlock()
-        except asyncio.TimeoutError:
-            pass
-
-        mqtt_client.loop()
+                if command == b"LOCK":
+                    logger.info("Execute locking: SESAME UUID = %s", sesame_uuid)
+                    await connected_devices[sesame_uuid].device.lock()
+                elif command == b"UNLOCK":
+                    logger.info("Execute unlocking: SESAME UUID = %s", sesame_uuid)
+                    await connected_devices[sesame_uuid].device.unlock()
 
 
 async def cleanup():
@@ -242,13 +389,14 @@ async def cleanup():
 
     logger.info("Cleanup...")
 
-    lwt_topic = "{}/LWT".format(config["mqtt"]["topic_prefix"])
-    logger.debug("Publish a message: topic={}, payload=offline".format(lwt_topic))
-    mqtt_client.publish(lwt_topic, payload="offline", qos=1, retain=True)
+    logger.debug("Publish a message: topic=%s, payload=offline", LWT_TOPIC)
+    mqtt_client.publish(LWT_TOPIC, payload="offline", qos=1, retain=True)
     mqtt_client.disconnect()
+    mqtt_client.loop_stop()
 
 
-def main():
+@functools.lru_cache(maxsize=None)
+def get_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser()
     parser.add_argument(
         "-v",
@@ -258,7 +406,11 @@ def main():
         const=logging.DEBUG,
         default=logging.INFO,
     )
-    args = parser.parse_args()
+    return parser
+
+
+def main():
+    args = get_parser().parse_args()
     logger.setLevel(level=args.loglevel)
 
     try:
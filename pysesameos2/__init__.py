@@ -1,8 +1,22 @@
 """Top-level package for pysesameos2."""
+import functools
+
 try:
     import importlib.metadata as importlib_metadata
 except ModuleNotFoundError:  # pragma: no cover
     import importlib_metadata  # type: ignore
 
 __author__ = """Masaki Tagawa"""
-__version__ = importlib_metadata.version(__name__)
+
+
+@functools.lru_cache(maxsize=None)
+def _get_version() -> str:
+    return importlib_metadata.version(__name__)
+
+
+def __getattr__(name: str) -> str:
+    # `__version__` is resolved on first access (PEP 562), so importing the package
+    # does not have to read the distribution metadata.
+    if name == "__version__":
+        return _get_version()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
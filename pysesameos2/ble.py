@@ -1,8 +1,10 @@
 import asyncio
 import base64
+import functools
 import logging
+import operator
 import uuid
-from typing import TYPE_CHECKING, Dict, Optional, Tuple, Union
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple, Union
 
 from bleak import BleakScanner
 from bleak.backends.device import BLEDevice
@@ -24,6 +26,10 @@ if TYPE_CHECKING:
 
 logger = logging.getLogger(__name__)
 
+_PKT_START = BlePacketType.isStart.value
+_PKT_NOT_START = BlePacketType.NotStart.value
+_PKT_APPEND = BlePacketType.APPEND_ONLY.value
+
 
 class CHSesame2BleTransmiter:
     def __init__(self, segment_type: BleCommunicationType, data: bytes) -> None:
@@ -38,17 +44,28 @@ class CHSesame2BleTransmiter:
         if not isinstance(data, bytes):
             raise TypeError("Invalid data")
 
-        self._mtu = 19
+        mtu = 19
         self._input = data
         self._BleCommunicationType = segment_type
-        self._isStartFirstCut = True
 
-        self._waitsend = [
-            data[i : i + self._mtu] for i in range(0, len(data), self._mtu)
-        ]
-        logger.debug(
-            "The packet is fragmented into {} packets.".format(len(self._waitsend))
-        )
+        # Every chunk (header + body) is built here at once, so that `getChunk`
+        # only has to hand them out one by one.
+        # Slicing a memoryview does not copy, the bytes of each body are only
+        # copied once when they are joined with the header.
+        mv = memoryview(data)
+        bodies = [mv[i : i + mtu] for i in range(0, len(data), mtu)]
+
+        # Only the first and the last chunk have their own header, every other
+        # chunk shares the same one.
+        n = len(bodies)
+        headers = [bytes((_PKT_NOT_START | _PKT_APPEND << 1,))] * n
+        if n:
+            headers[-1] = bytes((_PKT_NOT_START | segment_type.value << 1,))
+            first_seg = segment_type.value if n == 1 else _PKT_APPEND
+            headers[0] = bytes((_PKT_START | first_seg << 1,))
+        self._chunks = tuple(map(operator.add, headers, bodies))
+        self._index = 0
+        logger.debug("The packet is fragmented into %d packets.", len(self._chunks))
 
     def getChunk(self) -> Optional[bytes]:
         """Return a chunk of packet to be sent.
@@ -56,85 +73,87 @@ class CHSesame2BleTransmiter:
         Returns:
             bytes: The data can be transmitted (MTU size-aware)
         """
-        if self._isStartFirstCut:
-            header = bytes(
-                [
-                    BlePacketType.isStart.value
-                    | (
-                        (
-                            self._BleCommunicationType.value
-                            if len(self._waitsend) == 1
-                            else BlePacketType.APPEND_ONLY.value
-                        )
-                        << 1
-                    )
-                ]
-            )
-            self._isStartFirstCut = False
-            logger.debug(f"getChunk: This is the first packet, header={header.hex()}")
-            return header + self._waitsend[0]
-        else:
-            f = self._waitsend[1:]
-            self._waitsend = f
-            if len(f) == 0:
-                return None
-
-            header = bytes(
-                [
-                    BlePacketType.NotStart.value
-                    | (
-                        (
-                            self._BleCommunicationType.value
-                            if len(self._waitsend) == 1
-                            else BlePacketType.APPEND_ONLY.value
-                        )
-                        << 1
-                    )
-                ]
-            )
-            logger.debug(
-                f"getChunk: This is not a first packet, header={header.hex()}, left={len(self._waitsend)} pkts"
-            )
-            return header + self._waitsend[0]
+        if self._index >= len(self._chunks):
+            return None
+
+        chunk = self._chunks[self._index]
+        self._index += 1
+        logger.debug(
+            "getChunk: header=%02x, left=%d pkts",
+            chunk[0],
+            len(self._chunks) - self._index,
+        )
+        return chunk
+
+    def __iter__(self) -> Iterator[bytes]:
+        """Iterate over the chunks which have not been returned by `getChunk` yet.
+
+        Returns:
+            Iterator[bytes]: The data can be transmitted (MTU size-aware)
+        """
+        chunks = self._chunks[self._index :]
+        self._index = len(self._chunks)
+        return iter(chunks)
 
 
 class CHSesame2BleReceiver:
+    # Every device owns a receiver, so it only keeps the fragments of the packet
+    # being reassembled and drops them as soon as the packet is complete.
+    __slots__ = ("_parts",)
+
     def __init__(self) -> None:
         """An object responsible for rerceiving data using BLE.
 
         The most important role is to merge the fragmented packets.
         """
-        self.buffer = bytearray()
+        self._parts: List[Union[bytes, memoryview]] = []
+
+    def _start(self, barr: Union[bytes, memoryview]) -> None:
+        self._parts = [barr[1:]]
+
+    def _append(self, barr: Union[bytes, memoryview]) -> None:
+        logger.debug("feed: This is a subsequent fragmented packet.")
+        self._parts.append(barr[1:])
+
+    # Indexed by the lowest bit of the header, which marks the first fragment.
+    # Kept on the class, as bound methods stored on the instance would form a
+    # reference cycle that only the garbage collector can free.
+    _handlers = (_append, _start)
 
     def feed(
-        self, barr: bytes
+        self, barr: Union[bytes, memoryview]
     ) -> Union[Tuple[BleCommunicationType, bytes], Tuple[None, None]]:
         """Handle a received packet.
 
         Args:
-            barr (bytes): The received rawdata.
+            barr (Union[bytes, memoryview]): The received rawdata. A memoryview is
+                only read until the packet is complete, and must not be modified
+                in the meantime.
 
         Returns:
-            Union[Tuple[BleCommunicationType, bytes], Tuple[None, None]]: [description]
+            Union[Tuple[BleCommunicationType, bytes], Tuple[None, None]]: The
+            segment type and the reassembled packet, or `(None, None)` while the
+            packet is still fragmented.
         """
         b = barr[0]
-        i = b & 1
-        i2 = b >> 1
 
-        if i > 0:
-            self.buffer = bytearray(barr[1:])
-        else:
-            logger.debug("feed: This is the last fragmented packet.")
-            self.buffer += barr[1:]
+        # The fragments are only collected here and joined once the last one
+        # arrives, instead of growing a buffer on every packet.
+        self._handlers[b & 1](self, barr)
 
+        i2 = b >> 1
         if i2 == 0:
             logger.debug("feed: This is a part of fragmented packet.")
             return (None, None)
 
-        return (BleCommunicationType(i2), bytes(self.buffer))
+        payload = b"".join(self._parts)
+        self._parts = []
+        return (BleCommunicationType(i2), payload)
 
 
 class CHSesame2BlePayload:
+    __slots__ = ("_op_code", "_item_code", "_data", "_full")
+
     def __init__(self, op_code: BleOpCode, item_code: BleItemCode, data: bytes) -> None:
         """Represents a payload of a packet to be sent.
 
@@ -143,16 +162,17 @@ class CHSesame2BlePayload:
             item_code (BleItemCode): The item to be operated.
             data (bytes): The rawdata.
         """
-        if not isinstance(op_code, BleOpCode):
+        if __debug__ and not isinstance(op_code, BleOpCode):
             raise TypeError("Invalid op_code")
-        if not isinstance(item_code, BleItemCode):
+        if __debug__ and not isinstance(item_code, BleItemCode):
             raise TypeError("Invalid item_code")
-        if not isinstance(data, bytes):
+        if __debug__ and not isinstance(data, bytes):
             raise TypeError("Invalid data")
 
         self._op_code = op_code
         self._item_code = item_code
         self._data = data
+        self._full = bytes((op_code.value, item_code.value)) + data
 
     def getOpCode(self) -> BleOpCode:
         """Return an executed operation code.
@@ -176,21 +196,25 @@ class CHSesame2BlePayload:
         Returns:
             bytes: The rawdata to be sent.
         """
-        return bytes([self._op_code.value, self._item_code.value]) + self._data
+        return self._full
 
 
 class CHSesame2BleNotify:
+    __slots__ = ("_data", "_notifyOpCode", "_payload")
+
     def __init__(self, data: bytes) -> None:
         """A representation of a notification from a device.
 
         Args:
             data (bytes): The rawdata.
         """
-        if not isinstance(data, bytes):
+        # A packet object is built for every notification, so the type checks
+        # of these internal classes are skipped when running with `python -O`.
+        if __debug__ and not isinstance(data, bytes):
             raise TypeError("Invalid data")
 
         self._data = data
-        self._notifyOpCode = BleOpCode(int(data[0]))
+        self._notifyOpCode = BleOpCode(data[0])
         self._payload = data[1:]
 
     def getNotifyOpCode(self) -> BleOpCode:
@@ -211,17 +235,19 @@ class CHSesame2BleNotify:
 
 
 class CHSesame2BlePublish:
+    __slots__ = ("_data", "_cmdItCode", "_payload")
+
     def __init__(self, data: bytes) -> None:
         """A representation of a publish packet.
 
         Args:
             data (bytes): The rawdata.
         """
-        if not isinstance(data, bytes):
+        if __debug__ and not isinstance(data, bytes):
             raise TypeError("Invalid data")
 
         self._data = data
-        self._cmdItCode = BleItemCode(int(data[0]))
+        self._cmdItCode = BleItemCode(data[0])
         self._payload = data[1:]
 
     def getCmdItCode(self) -> BleItemCode:
@@ -242,19 +268,21 @@ class CHSesame2BlePublish:
 
 
 class CHSesame2BleResponse:
+    __slots__ = ("_data", "_cmdItCode", "_cmdOPCode", "_cmdResultCode", "_payload")
+
     def __init__(self, data: bytes) -> None:
         """A representation of a response packet.
 
         Args:
             data (bytes): The rawdata.
         """
-        if not isinstance(data, bytes):
+        if __debug__ and not isinstance(data, bytes):
             raise TypeError("Invalid data")
 
         self._data = data
-        self._cmdItCode = BleItemCode(int(data[0]))
-        self._cmdOPCode = BleOpCode(int(data[1]))
-        self._cmdResultCode = BleCmdResultCode(int(data[2]))
+        self._cmdItCode = BleItemCode(data[0])
+        self._cmdOPCode = BleOpCode(data[1])
+        self._cmdResultCode = BleCmdResultCode(data[2])
         self._payload = data[3:]
 
     def getCmdItCode(self) -> BleItemCode:
@@ -290,7 +318,31 @@ class CHSesame2BleResponse:
         return self._payload
 
 
+_WM2_UUID_PREFIX = bytes.fromhex("00000000055afd810001")
+
+
+# The device ID only depends on these fields, and they do not change between
+# scans, so reuse the ID decoded for a previous advertisement.
+@functools.lru_cache(maxsize=256)
+def _decode_device_id(
+    product_model: CHProductModel, name: Optional[str], adv_id: bytes
+) -> uuid.UUID:
+    if product_model == CHProductModel.WM2:
+        return uuid.UUID(bytes=_WM2_UUID_PREFIX + adv_id)
+    return uuid.UUID(bytes=base64.b64decode(f"{name}==".encode("ascii")))
+
+
 class BLEAdvertisement:
+    __slots__ = (
+        "_address",
+        "_device",
+        "_rssi",
+        "_advBytes",
+        "_productModel",
+        "_isRegistered",
+        "_deviceId",
+    )
+
     def __init__(self, dev: BLEDevice, manufacturer_data: dict) -> None:
         if not isinstance(dev, BLEDevice):
             raise TypeError("Invalid dev")
@@ -305,14 +357,9 @@ class BLEAdvertisement:
         self._productModel = CHProductModel.getByValue(self._advBytes[0])
         self._isRegistered = (self._advBytes[2] & 1) > 0
 
-        if self._productModel == CHProductModel.WM2:
-            self._deviceId = uuid.UUID(
-                "00000000055afd810001" + self._advBytes[3:9].hex()
-            )
-        else:
-            self._deviceId = uuid.UUID(
-                bytes=base64.b64decode("{}==".format(dev.name).encode("utf-8"))
-            )
+        self._deviceId = _decode_device_id(
+            self._productModel, dev.name, bytes(self._advBytes[3:9])
+        )
 
     def getAddress(self) -> str:
         return self._address
@@ -351,22 +398,24 @@ class CHBleManager:
 
         # `BLEDevice.metadata` should return device specific details in OS-agnostically way.
         # https://bleak.readthedocs.io/en/latest/api.html#bleak.backends.device.BLEDevice.metadata
-        if (
-            dev.metadata is None
-            or "uuids" not in dev.metadata
-            or "manufacturer_data" not in dev.metadata
-        ):
+        metadata = dev.metadata
+        if metadata is None:
             raise ValueError("Failed to find the device metadata")
 
-        if SERVICE_UUID in dev.metadata["uuids"]:
-            adv = BLEAdvertisement(dev, dev.metadata["manufacturer_data"])
-            device = adv.getProductModel().deviceFactory()()
-            device.setAdvertisement(adv)
+        uuids = metadata.get("uuids")
+        manufacturer_data = metadata.get("manufacturer_data")
+        if not uuids or not manufacturer_data:
+            raise ValueError("Failed to find the device metadata")
 
-            return device
-        else:
+        if SERVICE_UUID not in uuids:
             raise ValueError("Failed to find the service uuid")
 
+        adv = BLEAdvertisement(dev, manufacturer_data)
+        device = adv.getProductModel().deviceFactory()()
+        device.setAdvertisement(adv)
+
+        return device
+
     async def scan(
         self, scan_duration: int = 10
     ) -> Dict[str, Union["CHSesame2", "CHSesameBot"]]:
@@ -381,7 +430,9 @@ class CHBleManager:
         logger.info("Starting scan for SESAME devices...")
         ret = {}
         try:
-            devices = await asyncio.wait_for(BleakScanner.discover(), scan_duration)
+            devices = await asyncio.wait_for(
+                BleakScanner.discover(service_uuids=[SERVICE_UUID]), scan_duration
+            )
 
             for device in devices:
                 try:
@@ -398,7 +449,7 @@ class CHBleManager:
         except BleakError as e:
             logger.exception(e)
 
-        logger.info("Scan completed: found {} devices".format(len(ret)))
+        logger.info("Scan completed: found %d devices", len(ret))
         return ret
 
     async def scan_by_address(
@@ -414,7 +465,7 @@ class CHBleManager:
             Union[CHSesame2, CHSesameBot]: Devices discovered.
         """
         logger.info(
-            "Starting scan for the SESAME device ({})...".format(ble_device_identifier)
+            "Starting scan for the SESAME device (%s)...", ble_device_identifier
         )
 
         # We do use `BleakScanner.discover` instead of
@@ -427,13 +478,16 @@ class CHBleManager:
         # OS-agnostic `metadata` of the device.
         # https://github.com/hbldh/bleak/blob/55a2d34cc96bb842be278485794806704caa2d2c/bleak/backends/scanner.py#L101
         # https://github.com/hbldh/bleak/blob/ce63ed4d92430f154ce33ab812e313961b26f7a4/bleak/backends/bluezdbus/scanner.py#L213-L237
+        #
+        # Either way, the scan is filtered by the SESAME service UUID so that the OS
+        # does not report advertisements from unrelated devices at all.
 
-        devices = await asyncio.wait_for(BleakScanner.discover(), scan_duration)
-
-        device = next(
-            (d for d in devices if d.address.lower() == ble_device_identifier.lower()),
-            None,
+        devices = await asyncio.wait_for(
+            BleakScanner.discover(service_uuids=[SERVICE_UUID]), scan_duration
         )
+
+        target = ble_device_identifier.lower()
+        device = next((d for d in devices if d.address.lower() == target), None)
         if device is None:
             raise ConnectionRefusedError("Scan completed: the device not found")
 
@@ -444,7 +498,5 @@ class CHBleManager:
         except ValueError:
             raise ValueError("This is not a SESAME device.")
 
-        obj = self.device_factory(device)
-
         logger.info("Scan completed: found the device")
         return obj
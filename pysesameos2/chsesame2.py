@@ -1,11 +1,10 @@
 import asyncio
 import logging
+import struct
 from datetime import datetime
 from typing import TYPE_CHECKING, Callable, Optional
 
 from bleak import BleakClient
-from cryptography.hazmat.primitives import cmac
-from cryptography.hazmat.primitives.ciphers import algorithms
 
 from pysesameos2.ble import (
     CHSesame2BleNotify,
@@ -27,7 +26,7 @@ from pysesameos2.const import (
     CHSesame2Intention,
     CHSesame2Status,
 )
-from pysesameos2.crypto import AppKeyFactory, BleCipher
+from pysesameos2.crypto import AppKeyFactory, BleCipher, aes_cmac
 from pysesameos2.device import CHSesameLock
 from pysesameos2.helper import (
     CHProductModel,
@@ -42,6 +41,8 @@ if TYPE_CHECKING:
 
 logger = logging.getLogger(__name__)
 
+_UINT32_LE = struct.Struct("<I")
+
 
 class CHSesame2BleLoginResponse:
     def __init__(self, data: bytes) -> None:
@@ -53,10 +54,13 @@ class CHSesame2BleLoginResponse:
         if not isinstance(data, bytes):
             raise TypeError("Invalid data")
 
-        self._systemTime = datetime.fromtimestamp(int.from_bytes(data[0:4], "little"))
+        (system_time,) = _UINT32_LE.unpack_from(data, 0)
+        self._systemTime = datetime.fromtimestamp(system_time)
         # ??? data[4:8]
-        self._SSM2MechSetting = CHSesame2MechSettings(rawdata=data[8:20])
-        self._SSM2MechStatus = CHSesame2MechStatus(rawdata=data[20:28])
+        # The status objects parse a view of the response without copying it.
+        view = memoryview(data)
+        self._SSM2MechSetting = CHSesame2MechSettings(rawdata=view[8:20])
+        self._SSM2MechStatus = CHSesame2MechStatus(rawdata=view[20:28])
 
     def getMechSetting(self) -> CHSesame2MechSettings:
         """Return a mechanical setting of a device.
@@ -76,6 +80,8 @@ class CHSesame2BleLoginResponse:
 
 
 class CHSesame2(CHSesameLock):
+    __slots__ = ("_rxBuffer", "_txBuffer", "_mechStatus", "_mechSetting", "_client")
+
     def __init__(self) -> None:
         """SESAME3 Device Specific Implementation."""
         super().__init__()
@@ -114,7 +120,7 @@ class CHSesame2(CHSesameLock):
         if not isinstance(status, CHSesame2MechStatus):
             raise TypeError("Invalid status")
 
-        logger.debug(f"setMechStatus: {str(status)}")
+        logger.debug("setMechStatus: %s", status)
         self._mechStatus = status
 
         if status.getTarget() == -32768:
@@ -146,7 +152,7 @@ class CHSesame2(CHSesameLock):
         if not isinstance(setting, CHSesame2MechSettings):
             raise TypeError("Invalid setting")
 
-        logger.debug(f"setMechSetting: {str(setting)}")
+        logger.debug("setMechSetting: %s", setting)
         self._mechSetting = setting
 
     def getIntention(self) -> CHSesame2Intention:
@@ -163,7 +169,7 @@ class CHSesame2(CHSesameLock):
         Args:
             intent (CHSesame2Intention): The intention of the device
         """
-        logger.debug(f"setIntention: {intent}")
+        logger.debug("setIntention: %s", intent)
         self._intention = intent
 
     async def connect(self) -> None:
@@ -179,7 +185,7 @@ class CHSesame2(CHSesameLock):
             raise RuntimeError("Failed to connect the device.")
         self._client.set_disconnected_callback(self.onConnectionStateChange)
 
-        logger.info(f"Connected to the device: {self.getDeviceUUID()}")
+        logger.info("Connected to the device: %s", self.getDeviceUUID())
         self.setDeviceStatus(CHSesame2Status.WaitingGatt)
         services = await self._client.get_services()
         for s in services:
@@ -192,40 +198,40 @@ class CHSesame2(CHSesameLock):
 
     async def disconnect(self) -> None:
         try:
-            logger.info(f"Disconnecting from the device: {self.getDeviceUUID()}")
+            logger.info("Disconnecting from the device: %s", self.getDeviceUUID())
             self.setDeviceStatus(CHSesame2Status.NoBleSignal)
             await self._client.stop_notify(RX_UUID)
             await self._client.disconnect()
             logger.info(
-                f"Successfully disconnected from the device: {self.getDeviceUUID()}"
+                "Successfully disconnected from the device: %s", self.getDeviceUUID()
             )
         except (ValueError, Exception):
             logger.exception(
-                f"Error disconnecting to the device: {self.getDeviceUUID()}"
+                "Error disconnecting to the device: %s", self.getDeviceUUID()
             )
             pass
 
     async def transmit(self) -> None:
-        if self.getCharacteristicTX() is not None:
-            c = self.getCharacteristicTX()
-
-            tx_buffer = self.getTxBuffer()
-            if tx_buffer is not None:
-                chunk = tx_buffer.getChunk()
-                while chunk is not None:
-                    logger.debug(f"BLE Transmit: {c}")
-                    await self._client.write_gatt_char(c, chunk, response=False)
-                    chunk = tx_buffer.getChunk()
-        else:
+        c = self._characteristicTX
+        if c is None:
             raise RuntimeError(
                 "Attempted to send data without completing the initial negotiation."
             )
 
+        tx_buffer = self._txBuffer
+        if tx_buffer is None:
+            return
+
+        write = self._client.write_gatt_char
+        for chunk in tx_buffer:
+            logger.debug("BLE Transmit: %s", c)
+            await write(c, chunk, response=False)
+
     async def sendCommand(
         self, payload: CHSesame2BlePayload, is_cipher: BleCommunicationType
     ) -> None:
         if is_cipher == BleCommunicationType.ciphertext:
-            cipher = self.getCipher()
+            cipher = self._cipher
             payload_full = (
                 cipher.encrypt(payload.toDataWithHeader())
                 if cipher is not None
@@ -236,20 +242,24 @@ class CHSesame2(CHSesameLock):
 
         if payload_full is not None:
             logger.debug(
-                f"sendCommand: UUID={self.getDeviceUUID()}, is_cipher={is_cipher}, OpCode={payload.getOpCode()}, ItCode={payload.getItCode()}"
+                "sendCommand: UUID=%s, is_cipher=%s, OpCode=%s, ItCode=%s",
+                self.getDeviceUUID(),
+                is_cipher,
+                payload.getOpCode(),
+                payload.getItCode(),
             )
             self.setTxBuffer(CHSesame2BleTransmiter(is_cipher, payload_full))
             await self.transmit()
 
     async def loginSesame(self) -> None:
-        logging.debug(f"Login to the device: {self.getDeviceUUID()}")
+        logger.debug("Login to the device: %s", self.getDeviceUUID())
 
         remote_keys = self.getKey()
-        sesame_sk = remote_keys.getSecretKey()
+        sk_cmac = remote_keys.getSecretKeyCmac()
         sesame_keyindex = remote_keys.getKeyIndex()
         sesame_pk = remote_keys.getSesame2PublicKey()
         sesame_token = self.getSesameToken()
-        if not sesame_sk or not sesame_keyindex or not sesame_pk or not sesame_token:
+        if sk_cmac is None or not sesame_keyindex or not sesame_pk or not sesame_token:
             raise RuntimeError("Missing parameters from the device for login process.")
 
         local_keys = AppKeyFactory.get_instance()
@@ -258,18 +268,14 @@ class CHSesame2(CHSesameLock):
 
         tokens = local_token + sesame_token
 
-        c = cmac.CMAC(algorithms.AES(sesame_sk))
-        c.update(sesame_keyindex + local_pk + tokens)
-        cmac_tag_response = c.finalize()[0:4]
+        login_data = b"".join((sesame_keyindex, local_pk, tokens))
+        sk_cmac.update(login_data)
+        cmac_tag_response = sk_cmac.finalize()[0:4]
 
-        c = cmac.CMAC(algorithms.AES(local_keys.ecdh(sesame_pk)[0:16]))
-        c.update(tokens)
-        cmac_tag = c.finalize()
+        cmac_tag = aes_cmac(local_keys.ecdh(sesame_pk)[0:16], tokens)
 
         self.setCipher(BleCipher(cmac_tag, tokens))
-        payload = (
-            sesame_keyindex + local_pk + local_keys.getAppToken() + cmac_tag_response
-        )
+        payload = b"".join((sesame_keyindex, local_pk, local_token, cmac_tag_response))
 
         self.setDeviceStatus(CHSesame2Status.BleLogining)
         await self.sendCommand(
@@ -283,8 +289,10 @@ class CHSesame2(CHSesameLock):
 
     async def onCharacteristicChanged(self, _: int, data: bytearray) -> None:
         # The value passed to this callback is actually being casted to `bytearray`.
-        # Here we explicitly re-cast it to `bytes` thereby the value should be immutable.
-        segment_type, rawdata = self.getRxBuffer().feed(bytes(data))
+        # bleak creates a new one for every notification, so the receiver can keep
+        # views of it and copy the fragments only once, into the immutable `bytes`
+        # of the reassembled packet.
+        segment_type, rawdata = self._rxBuffer.feed(memoryview(data))
 
         if rawdata is None:
             # Fragmented packet?
@@ -294,30 +302,37 @@ class CHSesame2(CHSesameLock):
             return
 
         # Decrypt if needed.
-        if segment_type == BleCommunicationType.plaintext:
+        if segment_type is BleCommunicationType.plaintext:
             notify_payload = CHSesame2BleNotify(rawdata)
-        elif segment_type == BleCommunicationType.ciphertext:
-            cipher = self.getCipher()
+        elif segment_type is BleCommunicationType.ciphertext:
+            cipher = self._cipher
             if cipher is None:
                 raise RuntimeError("setCipher should be called before decryption.")
             notify_payload = CHSesame2BleNotify(cipher.decrypt(rawdata))
 
-        if notify_payload.getNotifyOpCode() == BleOpCode.publish:
+        # Enum members are singletons, so they are compared by identity.
+        op_code = notify_payload.getNotifyOpCode()
+        if op_code is BleOpCode.publish:
             publish_payload = CHSesame2BlePublish(notify_payload.getPayload())
             logger.debug(
-                f"onCharacteristicChanged: Type=Notify, OpCode=Publish, CmdItCode={publish_payload.getCmdItCode()}"
+                "onCharacteristicChanged: Type=Notify, OpCode=Publish, CmdItCode=%s",
+                publish_payload.getCmdItCode(),
             )
             await self.onGattSesamePublish(publish_payload)
-
-        if notify_payload.getNotifyOpCode() == BleOpCode.response:
+        elif op_code is BleOpCode.response:
             response_payload = CHSesame2BleResponse(notify_payload.getPayload())
+            item_code = response_payload.getCmdItCode()
+            result_code = response_payload.getCmdResultCode()
             logger.debug(
-                f"onCharacteristicChanged: Type=Notify, OpCode=Response, CmdItCode={response_payload.getCmdItCode()}, CmdOPCode={response_payload.getCmdOPCode()}, CmdResultCode={response_payload.getCmdResultCode()}"
+                "onCharacteristicChanged: Type=Notify, OpCode=Response, CmdItCode=%s, CmdOPCode=%s, CmdResultCode=%s",
+                item_code,
+                response_payload.getCmdOPCode(),
+                result_code,
             )
 
             if (
-                response_payload.getCmdItCode() == BleItemCode.login
-                and response_payload.getCmdResultCode() == BleCmdResultCode.success
+                item_code is BleItemCode.login
+                and result_code is BleCmdResultCode.success
             ):
                 login_response = CHSesame2BleLoginResponse(
                     response_payload.getPayload()
@@ -325,9 +340,9 @@ class CHSesame2(CHSesameLock):
                 mech_setting = login_response.getMechSetting()
                 mech_status = login_response.getMechStatus()
 
-                logger.debug(f"onCharacteristicChanged: retrived {str(mech_setting)}")
+                logger.debug("onCharacteristicChanged: retrived %s", mech_setting)
                 self.setMechSetting(mech_setting)
-                logger.debug(f"onCharacteristicChanged: retrived {str(mech_status)}")
+                logger.debug("onCharacteristicChanged: retrived %s", mech_status)
                 self.setMechStatus(mech_status)
                 if mech_setting.isConfigured:
                     self.setDeviceStatus(
@@ -339,38 +354,45 @@ class CHSesame2(CHSesameLock):
                     self.setDeviceStatus(CHSesame2Status.NoSettings)
 
     async def onGattSesamePublish(self, publish_payload: CHSesame2BlePublish) -> None:
-        if publish_payload.getCmdItCode() == BleItemCode.initial:
-            logger.debug(
-                f"onGattSesamePublish: recieved token={publish_payload.getPayload().hex()}"
+        handler = self._PUBLISH_HANDLERS.get(publish_payload.getCmdItCode())
+        if handler is not None:
+            await handler(self, publish_payload.getPayload())
+
+    async def _onPublishInitial(self, data: bytes) -> None:
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("onGattSesamePublish: recieved token=%s", data.hex())
+        self.setSesameToken(data)
+
+        if not self.getRegistered():
+            self.setDeviceStatus(CHSesame2Status.ReadyToRegister)
+            raise NotImplementedError(
+                "This SESAME3 is not supported: initial configuration needed."
             )
-            self.setSesameToken(publish_payload.getPayload())
+        else:
+            await self.loginSesame()
 
-            if not self.getRegistered():
-                self.setDeviceStatus(CHSesame2Status.ReadyToRegister)
-                raise NotImplementedError(
-                    "This SESAME3 is not supported: initial configuration needed."
-                )
-            else:
-                await self.loginSesame()
-        elif publish_payload.getCmdItCode() == BleItemCode.mechStatus:
-            received_mechstatus = CHSesame2MechStatus(
-                rawdata=publish_payload.getPayload()
-            )
+    async def _onPublishMechStatus(self, data: bytes) -> None:
+        received_mechstatus = CHSesame2MechStatus(rawdata=data)
 
-            logger.debug(f"onGattSesamePublish: recieved {str(received_mechstatus)}")
-            self.setMechStatus(received_mechstatus)
-            self.setDeviceStatus(
-                CHSesame2Status.Locked
-                if received_mechstatus.isInLockRange()
-                else CHSesame2Status.Unlocked
-            )
-        elif publish_payload.getCmdItCode() == BleItemCode.mechSetting:
-            received_mechsetting = CHSesame2MechSettings(
-                rawdata=publish_payload.getPayload()
-            )
+        logger.debug("onGattSesamePublish: recieved %s", received_mechstatus)
+        self.setMechStatus(received_mechstatus)
+        self.setDeviceStatus(
+            CHSesame2Status.Locked
+            if received_mechstatus.isInLockRange()
+            else CHSesame2Status.Unlocked
+        )
+
+    async def _onPublishMechSetting(self, data: bytes) -> None:
+        received_mechsetting = CHSesame2MechSettings(rawdata=data)
 
-            logger.debug(f"onGattSesamePublish: recieved {str(received_mechsetting)}")
-            self.setMechSetting(received_mechsetting)
+        logger.debug("onGattSesamePublish: recieved %s", received_mechsetting)
+        self.setMechSetting(received_mechsetting)
+
+    _PUBLISH_HANDLERS = {
+        BleItemCode.initial: _onPublishInitial,
+        BleItemCode.mechStatus: _onPublishMechStatus,
+        BleItemCode.mechSetting: _onPublishMechSetting,
+    }
 
     async def lock(self, history_tag: str = "pysesameos2") -> None:
         """Locking.
@@ -381,7 +403,7 @@ class CHSesame2(CHSesameLock):
         if self.getDeviceStatus().value == CHDeviceLoginStatus.UnLogin:
             raise RuntimeError("No device connenction.")
 
-        logger.info(f"Lock: UUID={self.getDeviceUUID()}, history_tag={history_tag}")
+        logger.info("Lock: UUID=%s, history_tag=%s", self.getDeviceUUID(), history_tag)
         await self.sendCommand(
             CHSesame2BlePayload(
                 BleOpCode.async_,
@@ -400,7 +422,9 @@ class CHSesame2(CHSesameLock):
         if self.getDeviceStatus().value == CHDeviceLoginStatus.UnLogin:
             raise RuntimeError("No device connenction.")
 
-        logger.info(f"Unlock: UUID={self.getDeviceUUID()}, history_tag={history_tag}")
+        logger.info(
+            "Unlock: UUID=%s, history_tag=%s", self.getDeviceUUID(), history_tag
+        )
         await self.sendCommand(
             CHSesame2BlePayload(
                 BleOpCode.async_,
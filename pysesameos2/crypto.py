@@ -1,10 +1,25 @@
+import functools
 import secrets
+import struct
 import threading
 
-from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives import cmac, serialization
 from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.hazmat.primitives.ciphers import algorithms
 from cryptography.hazmat.primitives.ciphers.aead import AESCCM
 
+# Fixed header of ans1PubKeyEncoding
+_PUBKEY_HEADER = bytes.fromhex("3059301306072a8648ce3d020106082a8648ce3d03010703420004")
+
+_ECDH = ec.ECDH()
+
+
+@functools.lru_cache(maxsize=32)
+def _load_pubkey(pubkey: bytes) -> ec.EllipticCurvePublicKey:
+    # The public key of a device does not change, so reconnecting to the same
+    # device does not parse it again.
+    return serialization.load_der_public_key(_PUBKEY_HEADER + pubkey)  # type: ignore
+
 
 class AppKey:
     def __new__(cls):
@@ -24,44 +39,31 @@ class AppKey:
         and it is assumed that the key pair will be used for all instance.
         To enforce that, we must use `AppKeyFactory.get_instance` to get the instance.
         """
-        self._secretKey = ec.generate_private_key(ec.SECP256R1()).private_bytes(
+        self._secretKey = ec.generate_private_key(ec.SECP256R1())
+
+        # The key pair never changes, so the public key is only serialized once
+        # (without its fixed header).
+        self._pubKey = self._secretKey.public_key().public_bytes(
             encoding=serialization.Encoding.DER,
-            format=serialization.PrivateFormat.TraditionalOpenSSL,
-            encryption_algorithm=serialization.NoEncryption(),
-        )
+            format=serialization.PublicFormat.SubjectPublicKeyInfo,
+        )[len(_PUBKEY_HEADER) :]
 
         self._appToken = secrets.token_bytes(4)
         return self
 
     def __init__(self) -> None:  # pragma: no cover
-        self._secretKey: bytes
+        self._secretKey: ec.EllipticCurvePrivateKey
+        self._pubKey: bytes
         self._appToken: bytes
 
     def getAppToken(self) -> bytes:
         return self._appToken
 
     def getPubkey(self) -> bytes:
-        pk = (
-            serialization.load_der_private_key(self._secretKey, password=None)
-            .public_key()
-            .public_bytes(
-                encoding=serialization.Encoding.DER,
-                format=serialization.PublicFormat.SubjectPublicKeyInfo,
-            )
-        )
-
-        # Strip the fixed header
-        return pk[27:]
+        return self._pubKey
 
     def ecdh(self, remote_pubkey: bytes) -> bytes:
-        # Fixed header of ans1PubKeyEncoding
-        fixed_header = bytes.fromhex(
-            "3059301306072a8648ce3d020106082a8648ce3d03010703420004"
-        )
-
-        remote_pk: ec.EllipticCurvePublicKey = serialization.load_der_public_key(fixed_header + remote_pubkey)  # type: ignore
-        local_sk: ec.EllipticCurvePrivateKey = serialization.load_der_private_key(self._secretKey, password=None)  # type: ignore
-        shared_key = local_sk.exchange(ec.ECDH(), remote_pk)
+        shared_key = self._secretKey.exchange(_ECDH, _load_pubkey(remote_pubkey))
         return shared_key
 
 
@@ -80,37 +82,62 @@ class AppKeyFactory:
         Returns:
             AppKey: [description]
         """
-        with cls.__lock:
-            if cls.__instance is None:
-                cls.__instance = AppKey.__private_new__()
-        return cls.__instance
+        # Only the first call needs the lock, afterwards the key pair is just read.
+        instance = cls.__instance
+        if instance is None:
+            with cls.__lock:
+                if cls.__instance is None:
+                    cls.__instance = AppKey.__private_new__()
+                instance = cls.__instance
+        return instance
+
+
+def aes_cmac(key: bytes, data: bytes) -> bytes:
+    """Calculate the AES-CMAC of data.
+
+    Args:
+        key (bytes): The AES key.
+        data (bytes): The data to be authenticated.
+
+    Returns:
+        bytes: The CMAC tag.
+    """
+    c = cmac.CMAC(algorithms.AES(key))
+    c.update(data)
+    return c.finalize()
+
+
+# The nonce starts with a 5-byte little-endian counter, the highest bit of which
+# tells the direction (set for packets sent to the device).
+_PACK_U64 = struct.Struct("<Q").pack
+_COUNTER_MASK = 0x7FFFFFFFFF
+_DIRECTION_SEND = 0x8000000000
 
 
 class BleCipher:
     def __init__(self, session_key: bytes, session_token: bytes) -> None:
         self._session_key = session_key
         self._session_token = session_token
+        self._aesccm = AESCCM(key=session_key, tag_length=4)
         self._decryptCounter = 0
         self._encryptCounter = 0
 
     def decrypt(self, cipher_bytes: bytes) -> bytes:
-        header = (self._decryptCounter & 549755813887).to_bytes(5, "little")
+        header = _PACK_U64(self._decryptCounter & _COUNTER_MASK)[:5]
         nonce = header + self._session_token
         self._decryptCounter += 1
 
-        aesccm = AESCCM(key=self._session_key, tag_length=4)
-        plain_bytes = aesccm.decrypt(
-            nonce=nonce, data=cipher_bytes, associated_data=bytes([0])
+        plain_bytes = self._aesccm.decrypt(
+            nonce=nonce, data=cipher_bytes, associated_data=b"\x00"
         )
         return plain_bytes
 
     def encrypt(self, plain_bytes: bytes) -> bytes:
-        header = (self._encryptCounter | 549755813888).to_bytes(5, "little")
+        header = _PACK_U64(self._encryptCounter & _COUNTER_MASK | _DIRECTION_SEND)[:5]
         nonce = header + self._session_token
         self._encryptCounter += 1
 
-        aesccm = AESCCM(key=self._session_key, tag_length=4)
-        cipher_bytes = aesccm.encrypt(
-            nonce=nonce, data=plain_bytes, associated_data=bytes([0])
+        cipher_bytes = self._aesccm.encrypt(
+            nonce=nonce, data=plain_bytes, associated_data=b"\x00"
         )
         return cipher_bytes
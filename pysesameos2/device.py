@@ -1,23 +1,36 @@
 import asyncio
 import logging
 import uuid
-from typing import TYPE_CHECKING, Any, Callable, Optional, TypeVar, Union
+from typing import Any, Callable, Dict, Optional, TypeVar, Union
 
 from bleak.backends.characteristic import BleakGATTCharacteristic
+from cryptography.hazmat.primitives import cmac
+from cryptography.hazmat.primitives.ciphers import algorithms
 
+from pysesameos2.ble import BLEAdvertisement
 from pysesameos2.const import CHDeviceLoginStatus, CHSesame2Intention, CHSesame2Status
 from pysesameos2.crypto import BleCipher
-
-if TYPE_CHECKING:
-    from pysesameos2.ble import BLEAdvertisement
-    from pysesameos2.helper import CHProductModel
+from pysesameos2.helper import CHProductModel
 
 logger = logging.getLogger(__name__)
 
 
+def _coerce_key(key: Union[bytes, str], length: int, name: str) -> bytes:
+    if isinstance(key, (bytes, bytearray)):
+        key = bytes(key)
+    elif isinstance(key, str):
+        key = bytes.fromhex(key)
+    else:
+        raise TypeError(f"Invalid {name} - should be str or bytes.")
+    if len(key) != length:
+        raise ValueError(f"Invalid {name} - length should be {length}.")
+    return key
+
+
 class CHDeviceKey:
     def __init__(self) -> None:
         self._secretKey: Optional[bytes] = None
+        self._secretKeyCmac: Optional[cmac.CMAC] = None
         self._sesame2PublicKey: Optional[bytes] = None
 
         # According to the spec, this is fixed (;_;)...
@@ -31,6 +44,19 @@ class CHDeviceKey:
         """
         return self._secretKey
 
+    def getSecretKeyCmac(self) -> Optional[cmac.CMAC]:
+        """Return a CMAC context keyed with the secret key.
+
+        The AES key setup is done once in `setSecretKey`, and every call
+        returns a fresh copy of that context.
+
+        Returns:
+            Optional[cmac.CMAC]: The CMAC context, or None if no secret key is set.
+        """
+        if self._secretKeyCmac is None:
+            return None
+        return self._secretKeyCmac.copy()
+
     def getSesame2PublicKey(self) -> Optional[bytes]:
         """Return a public key of a specific device.
 
@@ -56,13 +82,8 @@ class CHDeviceKey:
         Raises:
             ValueError: If `key` is invalid.
         """
-        if not isinstance(key, bytes) and not isinstance(key, str):
-            raise TypeError("Invalid SecretKey - should be str or bytes.")
-        if not isinstance(key, bytes):
-            key = bytes.fromhex(key)
-        if len(key) != 16:
-            raise ValueError("Invalid SecretKey - length should be 16.")
-        self._secretKey = key
+        self._secretKey = _coerce_key(key, 16, "SecretKey")
+        self._secretKeyCmac = cmac.CMAC(algorithms.AES(self._secretKey))
 
     def setSesame2PublicKey(self, key: Union[bytes, str]) -> None:
         """Set a public key of a specific device.
@@ -73,22 +94,40 @@ class CHDeviceKey:
         Raises:
             ValueError: If `key` is invalid.
         """
-        if not isinstance(key, bytes) and not isinstance(key, str):
-            raise TypeError("Invalid Sesame2PublicKey - should be str or bytes.")
-        if not isinstance(key, bytes):
-            key = bytes.fromhex(key)
-        if len(key) != 64:
-            raise ValueError("Invalid Sesame2PublicKey - length should be 64.")
-        self._sesame2PublicKey = key
+        self._sesame2PublicKey = _coerce_key(key, 64, "Sesame2PublicKey")
+
 
+# What to do with the login event when a device enters each status.
+_LOGIN_EVENT_ACTIONS: Dict[CHSesame2Status, Callable[[asyncio.Event], None]] = {
+    status: (
+        asyncio.Event.set
+        if status.value == CHDeviceLoginStatus.Login
+        else asyncio.Event.clear
+    )
+    for status in CHSesame2Status.__members__.values()
+}
 
 CHD = TypeVar("CHD", bound="CHDevices")
 
 
 class CHDevices:
+    __slots__ = (
+        "_deviceId",
+        "_deviceIdStr",
+        "_productModel",
+        "_registered",
+        "_rssi",
+        "_deviceStatus",
+        "_deviceStatus_callback",
+        "_advertisement",
+        "_key",
+        "_login_event",
+    )
+
     def __init__(self) -> None:
         """Generic Implementation for Candyhouse products."""
         self._deviceId: Optional[uuid.UUID] = None
+        self._deviceIdStr: Optional[str] = None
         self._productModel: Optional[CHProductModel] = None
         self._registered: bool = False
         self._rssi: int = -100
@@ -105,10 +144,7 @@ class CHDevices:
         Returns:
             str: The UUID of the device.
         """
-        if self._deviceId is not None:
-            return str(self._deviceId).upper()
-        else:
-            return None
+        return self._deviceIdStr
 
     @property
     def productModel(self) -> Optional["CHProductModel"]:
@@ -173,6 +209,7 @@ class CHDevices:
         elif not isinstance(id, uuid.UUID):
             raise TypeError("Invalid UUID")
         self._deviceId = id
+        self._deviceIdStr = str(id).upper()
 
     def setProductModel(self, model: "CHProductModel") -> None:
         """Set a model information of a specific device.
@@ -183,7 +220,7 @@ class CHDevices:
         Raises:
             ValueError: If `model` is invalid.
         """
-        if type(model).__name__ != "CHProductModel":
+        if not isinstance(model, CHProductModel):
             raise TypeError("Invalid CHProductModel")
         self._productModel = model
 
@@ -206,14 +243,13 @@ class CHDevices:
         if not isinstance(status, CHSesame2Status):
             raise TypeError("Invalid Device Status")
 
-        if status != self.getDeviceStatus():
+        if status != self._deviceStatus:
             self._deviceStatus = status
-            if self._deviceStatus_callback:
-                self._deviceStatus_callback(self)
-            if self._deviceStatus.value == CHDeviceLoginStatus.UnLogin:
-                self._login_event.clear()
-            elif self._deviceStatus.value == CHDeviceLoginStatus.Login:
-                self._login_event.set()
+            callback = self._deviceStatus_callback
+            if callback:
+                callback(self)
+            # The callback may have changed the status again.
+            _LOGIN_EVENT_ACTIONS[self._deviceStatus](self._login_event)
 
     def setRegistered(self, isRegistered: bool) -> None:
         """Set a status of whether a device is already registed with the server.
@@ -235,7 +271,7 @@ class CHDevices:
         Raises:
             ValueError: If the device is not registred.
         """
-        if adv is not None and type(adv).__name__ != "BLEAdvertisement":
+        if adv is not None and not isinstance(adv, BLEAdvertisement):
             raise TypeError("Invalid BLEAdvertisement")
         else:
             self._advertisement = adv
@@ -246,22 +282,26 @@ class CHDevices:
             self.setRssi(-100)
             return
 
-        if adv.isRegistered() is False:
+        registered = adv.isRegistered()
+        if registered is False:
             raise RuntimeError(
                 "This device is not supported: initial configuration needed from the official mobile app."
             )
 
-        logger.debug(f"setAdvertisement: Product Model = {adv.getProductModel()}")
-        self.setProductModel(adv.getProductModel())
-
-        logger.debug(f"setAdvertisement: RSSI = {adv.getRssi()}")
-        self.setRssi(adv.getRssi())
+        product_model = adv.getProductModel()
+        rssi = adv.getRssi()
+        device_id = adv.getDeviceID()
 
-        logger.debug(f"setAdvertisement: Device ID (UUID) = {adv.getDeviceID()}")
-        self.setDeviceId(adv.getDeviceID())
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("setAdvertisement: Product Model = %s", product_model)
+            logger.debug("setAdvertisement: RSSI = %s", rssi)
+            logger.debug("setAdvertisement: Device ID (UUID) = %s", device_id)
+            logger.debug("setAdvertisement: isRegistered = %s", registered)
 
-        logger.debug(f"setAdvertisement: isRegistered = {adv.isRegistered()}")
-        self.setRegistered(adv.isRegistered())
+        self.setProductModel(product_model)
+        self.setRssi(rssi)
+        self.setDeviceId(device_id)
+        self.setRegistered(registered)
 
         if self.getDeviceStatus() == CHSesame2Status.NoBleSignal:
             self.setDeviceStatus(CHSesame2Status.ReceivedBle)
@@ -295,6 +335,8 @@ class CHDevices:
 
 
 class CHSesameLock(CHDevices):
+    __slots__ = ("_intention", "_characteristicTX", "_sesameToken", "_cipher")
+
     def __init__(self) -> None:
         """Generic Implementation for Candyhouse smart locks."""
         super().__init__()
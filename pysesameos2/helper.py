@@ -1,8 +1,11 @@
+import bisect
+import functools
 import importlib
 import logging
+import struct
 import sys
 from enum import Enum
-from typing import Generator, Union
+from typing import Generator, Tuple, Union
 
 if sys.version_info[:2] >= (3, 8):  # pragma: no cover
     from typing import TypedDict
@@ -11,6 +14,52 @@ else:  # pragma: no cover
 
 logger = logging.getLogger(__name__)
 
+# battery, target, position, retcode
+_SESAME2_MECH_STATUS = struct.Struct("<HhhB")
+# battery, motor status
+_BOT_MECH_STATUS = struct.Struct("<H2xB")
+# lock position, unlock position
+_SESAME2_MECH_SETTINGS = struct.Struct("<hh")
+# lock, unlock, click lock, click hold, click unlock seconds
+_BOT_LOCK_SECONDS = struct.Struct("5B")
+# body length, body (zero padded)
+_HISTORY_TAG = struct.Struct("B21s")
+
+# Battery discharge curves, in ascending order of voltage.
+_BATTERY_PCT = (0.0, 3.0, 7.0, 10.0, 13.0, 21.0, 32.0, 40.0, 50.0, 100.0)
+_SESAME2_BATTERY_VOL = (4.6, 4.8, 5.0, 5.1, 5.2, 5.4, 5.6, 5.7, 5.8, 6.0)
+_BOT_BATTERY_VOL = (2.3, 2.4, 2.5, 2.55, 2.6, 2.7, 2.8, 2.85, 2.9, 3.0)
+
+_BatterySegments = Tuple[Tuple[float, float, float], ...]
+
+
+def _battery_segments(list_vol: Tuple[float, ...]) -> _BatterySegments:
+    # (lower voltage, lower percentage, slope) of each segment of a curve.
+    return tuple(
+        (
+            list_vol[i - 1],
+            _BATTERY_PCT[i - 1],
+            (_BATTERY_PCT[i] - _BATTERY_PCT[i - 1]) / (list_vol[i] - list_vol[i - 1]),
+        )
+        for i in range(1, len(list_vol))
+    )
+
+
+_SESAME2_BATTERY_SEGMENTS = _battery_segments(_SESAME2_BATTERY_VOL)
+_BOT_BATTERY_SEGMENTS = _battery_segments(_BOT_BATTERY_VOL)
+
+
+def _battery_percentage(
+    cur_vol: float, list_vol: Tuple[float, ...], segments: _BatterySegments
+) -> int:
+    if cur_vol >= list_vol[-1]:
+        return 100
+    if cur_vol <= list_vol[0]:
+        return 0
+
+    vol, pct, slope = segments[bisect.bisect_left(list_vol, cur_vol) - 1]
+    return int(pct + (cur_vol - vol) * slope)
+
 
 class ProductData(TypedDict):
     deviceModel: str
@@ -19,6 +68,12 @@ class ProductData(TypedDict):
     deviceFactory: Union[str, None]
 
 
+@functools.lru_cache(maxsize=None)
+def _import_device_class(name: str) -> type:
+    # The device modules import this module, so they can only be imported lazily.
+    return getattr(importlib.import_module(f"pysesameos2.{name.lower()}"), name)
+
+
 class CHProductModel(Enum):
     WM2: ProductData = {
         "deviceModel": "wm_2",
@@ -45,15 +100,21 @@ class CHProductModel(Enum):
         "deviceFactory": "CHSesameBot",
     }
 
+    def __init__(self, data: ProductData) -> None:
+        # Unpack the product data once, so that the accessors below are plain
+        # attribute reads.
+        self._deviceModel = data["deviceModel"]
+        self._isLocker = data["isLocker"]
+        self._productType = data["productType"]
+        self._deviceFactory = data["deviceFactory"]
+
     @staticmethod
     def getByModel(model: str) -> "CHProductModel":
         if not isinstance(model, str):
             raise TypeError("Invalid Model")
         try:
-            return next(
-                e for e in list(CHProductModel) if e.value["deviceModel"] == model
-            )
-        except StopIteration:
+            return _PRODUCT_MODEL_BY_MODEL[model]
+        except KeyError:
             raise NotImplementedError(
                 "This device is not supported, unknown deviceModel: {}.".format(model)
             )
@@ -63,58 +124,82 @@ class CHProductModel(Enum):
         if not isinstance(val, int):
             raise TypeError("Invalid Value")
         try:
-            return next(
-                e for e in list(CHProductModel) if e.value["productType"] == val
-            )
-        except StopIteration:
+            return _PRODUCT_MODEL_BY_VALUE[val]
+        except KeyError:
             raise NotImplementedError(
                 "This device is not supported, unknown productType: {}.".format(val)
             )
 
     def deviceModel(self) -> str:
-        return self.value["deviceModel"]
+        return self._deviceModel
 
     def isLocker(self) -> bool:
-        return self.value["isLocker"]
+        return self._isLocker
 
     def productType(self) -> int:
-        return self.value["productType"]
+        return self._productType
 
     def deviceFactory(self) -> type:
-        if self.value["deviceFactory"] is None:
+        if self._deviceFactory is None:
             raise NotImplementedError(
                 "This device type is not supported, deviceFactory is missing."
             )
-        return getattr(
-            importlib.import_module(
-                f"pysesameos2.{self.value['deviceFactory'].lower()}"
-            ),
-            self.value["deviceFactory"],
-        )
+        return _import_device_class(self._deviceFactory)
+
+
+_PRODUCT_MODEL_BY_MODEL = {e.deviceModel(): e for e in CHProductModel}
+_PRODUCT_MODEL_BY_VALUE = {e.productType(): e for e in CHProductModel}
 
 
 class CHSesameProtocolMechStatus:
-    def __init__(self, rawdata: Union[bytes, str]) -> None:
+    __slots__ = (
+        "_batteryVoltage",
+        "_target",
+        "_position",
+        "_retcode",
+        "_flags",
+        "_batteryPercentage",
+    )
+
+    def __init__(self, rawdata: Union[bytes, memoryview, str]) -> None:
         """Represent a mechanical status of a device.
 
         Args:
-            rawdata (Union[bytes, str]): The rawdata from the device.
+            rawdata (Union[bytes, memoryview, str]): The rawdata from the device.
         """
-        if isinstance(rawdata, str):
-            data = bytes.fromhex(rawdata)
-        elif isinstance(rawdata, bytes):
+        if isinstance(rawdata, (bytes, memoryview)):
             data = rawdata
+        elif isinstance(rawdata, str):
+            data = bytes.fromhex(rawdata)
         else:
             raise TypeError("Invalid SesameProtocolMechStatus")
 
-        self._data = data
         self._batteryVoltage: float
         self._target: int
         self._position: int
         self._retcode: int
-        self._isInLockRange = data[7] & 2 > 0
-        self._isInUnlockRange = data[7] & 4 > 0
-        self._isBatteryCritical = data[7] & 32 > 0
+        self._batteryPercentage: int
+        # bit 1: in lock range, bit 2: in unlock range, bit 5: battery critical
+        self._flags = data[7]
+
+    def getBatteryPercentage(self) -> int:
+        """Return battery status information as a percentage.
+
+        Returns:
+            int: Battery power left as a percentage.
+        """
+        return self._batteryPercentage
+
+    def getBatteryPrecentage(self) -> int:
+        """Return battery status information as a percentage.
+        The method name contains typo, kept for backward compatibility.
+        Returns:
+            int: Battery power left as a percentage.
+        """
+        logger.error(
+            'This "getBatteryPrecentage" method is duplecated. Please use "getBatteryPercentage" instead.'
+        )
+        return self.getBatteryPercentage()
 
     def getBatteryVoltage(self) -> float:
         """Return battery status information as a voltage.
@@ -154,7 +239,7 @@ class CHSesameProtocolMechStatus:
         Returns:
             bool: `True` if it is locked, `False` if not.
         """
-        return self._isInLockRange
+        return self._flags & 2 > 0
 
     def isInUnlockRange(self) -> bool:
         """Return whether a device is currently unlocked.
@@ -162,157 +247,92 @@ class CHSesameProtocolMechStatus:
         Returns:
             bool: `True` if it is unlocked, `False` if not.
         """
-        return self._isInUnlockRange
+        return self._flags & 4 > 0
 
 
 class CHSesame2MechStatus(CHSesameProtocolMechStatus):
-    def __init__(self, rawdata: Union[bytes, str]) -> None:
+    __slots__ = ()
+
+    def __init__(self, rawdata: Union[bytes, memoryview, str]) -> None:
         """Represent a mechanical status of a SESAME3.
 
         Args:
-            rawdata (Union[bytes, str]): The rawdata from the device.
+            rawdata (Union[bytes, memoryview, str]): The rawdata from the device.
         """
-        if isinstance(rawdata, str):
-            data = bytes.fromhex(rawdata)
-        elif isinstance(rawdata, bytes):
+        if isinstance(rawdata, (bytes, memoryview)):
             data = rawdata
+        elif isinstance(rawdata, str):
+            data = bytes.fromhex(rawdata)
         else:
             raise TypeError("Invalid CHSesame2MechStatus")
 
         super().__init__(rawdata=data)
-        self._batteryVoltage = int.from_bytes(data[0:2], "little") * 7.2 / 1023
-        self._target = int.from_bytes(data[2:4], "little", signed=True)
-        self._position = int.from_bytes(data[4:6], "little", signed=True)
-        self._retcode = data[6]
-
-    def getBatteryPercentage(self) -> int:
-        """Return battery status information as a percentage.
-
-        Returns:
-            int: Battery power left as a percentage.
-        """
-        list_vol = [6.0, 5.8, 5.7, 5.6, 5.4, 5.2, 5.1, 5.0, 4.8, 4.6]
-        list_pct = [100.0, 50.0, 40.0, 32.0, 21.0, 13.0, 10.0, 7.0, 3.0, 0.0]
-        cur_vol = self._batteryVoltage
-
-        if cur_vol >= list_vol[0]:
-            return 100
-        elif cur_vol <= list_vol[-1]:
-            return 0
-        else:
-            ret = 0
-            i = 0
-            while i < len(list_vol) - 1:
-                if cur_vol > list_vol[i] or cur_vol <= list_vol[i + 1]:
-                    i = i + 1
-                    continue
-                else:
-                    f = (cur_vol - list_vol[i + 1]) / (list_vol[i] - list_vol[i + 1])
-                    f3 = list_pct[i]
-                    f4 = list_pct[i + 1]
-                    ret = int(f4 + (f * (f3 - f4)))
-                    break
-
-            return ret
-
-    def getBatteryPrecentage(self) -> int:
-        """Return battery status information as a percentage.
-        The method name contains typo, kept for backward compatibility.
-        Returns:
-            int: Battery power left as a percentage.
-        """
-        logger.error(
-            'This "getBatteryPrecentage" method is duplecated. Please use "getBatteryPercentage" instead.'
+        (
+            battery,
+            self._target,
+            self._position,
+            self._retcode,
+        ) = _SESAME2_MECH_STATUS.unpack_from(data)
+        self._batteryVoltage = battery * 7.2 / 1023
+        self._batteryPercentage = _battery_percentage(
+            self._batteryVoltage, _SESAME2_BATTERY_VOL, _SESAME2_BATTERY_SEGMENTS
         )
-        return self.getBatteryPercentage()
 
     def __str__(self) -> str:
-        return f"CHSesame2MechStatus(Battery={self.getBatteryPercentage()}% ({self.getBatteryVoltage():.2f}V), isInLockRange={self.isInLockRange()}, isInUnlockRange={self.isInUnlockRange()}, Position={self.getPosition()})"
+        flags = self._flags
+        return f"CHSesame2MechStatus(Battery={self._batteryPercentage}% ({self._batteryVoltage:.2f}V), isInLockRange={flags & 2 > 0}, isInUnlockRange={flags & 4 > 0}, Position={self._position})"
 
 
 class CHSesameBotMechStatus(CHSesameProtocolMechStatus):
-    def __init__(self, rawdata: Union[bytes, str]) -> None:
+    __slots__ = ("_motorStatus",)
+
+    def __init__(self, rawdata: Union[bytes, memoryview, str]) -> None:
         """Represent a mechanical status of a SESAME bot.
 
         Args:
-            rawdata (Union[bytes, str]): The rawdata from the device.
+            rawdata (Union[bytes, memoryview, str]): The rawdata from the device.
         """
-        if isinstance(rawdata, str):
-            data = bytes.fromhex(rawdata)
-        elif isinstance(rawdata, bytes):
+        if isinstance(rawdata, (bytes, memoryview)):
             data = rawdata
+        elif isinstance(rawdata, str):
+            data = bytes.fromhex(rawdata)
         else:
             raise TypeError("Invalid CHSesameBotMechStatus")
 
         super().__init__(rawdata=data)
-        self._batteryVoltage = int.from_bytes(data[0:2], "little") * 3.6 / 1023
-        self._motorStatus = data[4]
-
-    def getBatteryPercentage(self) -> int:
-        """Return battery status information as a percentage.
-
-        Returns:
-            int: Battery power left as a percentage.
-        """
-        list_vol = [3.0, 2.9, 2.85, 2.8, 2.7, 2.6, 2.55, 2.5, 2.4, 2.3]
-        list_pct = [100.0, 50.0, 40.0, 32.0, 21.0, 13.0, 10.0, 7.0, 3.0, 0.0]
-        cur_vol = self._batteryVoltage
-
-        if cur_vol >= list_vol[0]:
-            return 100
-        elif cur_vol <= list_vol[-1]:
-            return 0
-        else:
-            ret = 0
-            i = 0
-            while i < len(list_vol) - 1:
-                if cur_vol > list_vol[i] or cur_vol <= list_vol[i + 1]:
-                    i = i + 1
-                    continue
-                else:
-                    f = (cur_vol - list_vol[i + 1]) / (list_vol[i] - list_vol[i + 1])
-                    f3 = list_pct[i]
-                    f4 = list_pct[i + 1]
-                    ret = int(f4 + (f * (f3 - f4)))
-                    break
-
-            return ret
-
-    def getBatteryPrecentage(self) -> int:
-        """Return battery status information as a percentage.
-        The method name contains typo, kept for backward compatibility.
-        Returns:
-            int: Battery power left as a percentage.
-        """
-        logger.error(
-            'This "getBatteryPrecentage" method is duplecated. Please use "getBatteryPercentage" instead.'
+        battery, self._motorStatus = _BOT_MECH_STATUS.unpack_from(data)
+        self._batteryVoltage = battery * 3.6 / 1023
+        self._batteryPercentage = _battery_percentage(
+            self._batteryVoltage, _BOT_BATTERY_VOL, _BOT_BATTERY_SEGMENTS
         )
-        return self.getBatteryPercentage()
 
     def getMotorStatus(self) -> int:
         return self._motorStatus
 
     def __str__(self) -> str:
-        return f"CHSesameBotMechStatus(Battery={self.getBatteryPercentage()}% ({self.getBatteryVoltage():.2f}V), motorStatus={self.getMotorStatus()})"
+        return f"CHSesameBotMechStatus(Battery={self._batteryPercentage}% ({self._batteryVoltage:.2f}V), motorStatus={self._motorStatus})"
 
 
 class CHSesame2MechSettings:
-    def __init__(self, rawdata: Union[bytes, str]) -> None:
+    __slots__ = ("_lockPosition", "_unlockPosition")
+
+    def __init__(self, rawdata: Union[bytes, memoryview, str]) -> None:
         """Represent mechanical setting of a SESAME3.
 
         Args:
-            rawdata (Union[bytes, str]): The rawdata from the device.
+            rawdata (Union[bytes, memoryview, str]): The rawdata from the device.
         """
-        if isinstance(rawdata, str):
-            data = bytes.fromhex(rawdata)
-        elif isinstance(rawdata, bytes):
+        if isinstance(rawdata, (bytes, memoryview)):
             data = rawdata
+        elif isinstance(rawdata, str):
+            data = bytes.fromhex(rawdata)
         else:
             raise TypeError("Invalid CHSesame2MechSettings")
 
-        self._data = data
-        self._lockPosition = int.from_bytes(data[0:2], "little", signed=True)
-        self._unlockPosition = int.from_bytes(data[2:4], "little", signed=True)
+        (
+            self._lockPosition,
+            self._unlockPosition,
+        ) = _SESAME2_MECH_SETTINGS.unpack_from(data)
 
     @property
     def isConfigured(self) -> bool:
@@ -344,23 +364,27 @@ class CHSesame2MechSettings:
 
 
 class CHSesameBotMechSettings:
-    def __init__(self, rawdata: Union[bytes, str]) -> None:
+    __slots__ = ("_userPrefDir", "_lockSecConfig", "_buttonMode")
+
+    def __init__(self, rawdata: Union[bytes, memoryview, str]) -> None:
         """Represent mechanical setting of a SESAME bot.
 
         Args:
-            rawdata (Union[bytes, str]): The rawdata from the device.
+            rawdata (Union[bytes, memoryview, str]): The rawdata from the device.
         """
-        if isinstance(rawdata, str):
-            data = bytes.fromhex(rawdata)
-        elif isinstance(rawdata, bytes):
+        if isinstance(rawdata, (bytes, memoryview)):
             data = rawdata
+        elif isinstance(rawdata, str):
+            data = bytes.fromhex(rawdata)
         else:
             raise TypeError("Invalid CHSesameBotMechSettings")
 
-        self._data = data
-        self._userPrefDir = CHSesameBotUserPreDir(bytes([data[0]]))
         self._lockSecConfig = CHSesameBotLockSecondsConfiguration(rawdata=data[1:6])
-        self._buttonMode = CHSesameBotButtonMode(bytes([data[6]]))
+        try:
+            self._userPrefDir = _USER_PREF_DIR_BY_BYTE[data[0]]
+            self._buttonMode = _BUTTON_MODE_BY_BYTE[data[6]]
+        except (IndexError, KeyError):
+            raise ValueError("Invalid CHSesameBotMechSettings")
 
     def getButtonMode(self) -> "CHSesameBotButtonMode":
         return self._buttonMode
@@ -383,25 +407,34 @@ class CHSesameBotUserPreDir(Enum):
 
 
 class CHSesameBotLockSecondsConfiguration:
-    def __init__(self, rawdata: Union[bytes, str]) -> None:
+    __slots__ = (
+        "_lockSec",
+        "_unlockSec",
+        "_clickLockSec",
+        "_clickHoldSec",
+        "_clickUnlockSec",
+    )
+
+    def __init__(self, rawdata: Union[bytes, memoryview, str]) -> None:
         """Represent detailed time settings for various actions of a SESAME bot.
 
         Args:
-            rawdata (Union[bytes, str]): The rawdata from the device.
+            rawdata (Union[bytes, memoryview, str]): The rawdata from the device.
         """
-        if isinstance(rawdata, str):
-            data: bytes = bytes.fromhex(rawdata)
-        elif isinstance(rawdata, bytes):
+        if isinstance(rawdata, (bytes, memoryview)):
             data = rawdata
+        elif isinstance(rawdata, str):
+            data = bytes.fromhex(rawdata)
         else:
             raise TypeError("Invalid CHSesameBotLockSecondsConfiguration")
 
-        self._data = data
-        self._lockSec = int.from_bytes([data[0]], "little")
-        self._unlockSec = int.from_bytes([data[1]], "little")
-        self._clickLockSec = int.from_bytes([data[2]], "little")
-        self._clickHoldSec = int.from_bytes([data[3]], "little")
-        self._clickUnlockSec = int.from_bytes([data[4]], "little")
+        (
+            self._lockSec,
+            self._unlockSec,
+            self._clickLockSec,
+            self._clickHoldSec,
+            self._clickUnlockSec,
+        ) = _BOT_LOCK_SECONDS.unpack_from(data)
 
     def getLockSec(self) -> int:
         """Return a number of seconds taken to rotate forward.
@@ -451,6 +484,19 @@ class CHSesameBotButtonMode(Enum):
     toggle = bytes([1])
 
 
+# Members keyed by the int of their one-byte value, so that a lookup needs
+# neither a slice nor a new bytes object.
+_USER_PREF_DIR_BY_BYTE = {m.value[0]: m for m in CHSesameBotUserPreDir}
+_BUTTON_MODE_BY_BYTE = {m.value[0]: m for m in CHSesameBotButtonMode}
+
+
+def _truncate_utf8(s: bytes, n: int) -> bytes:
+    """Truncate UTF-8 s to at most n bytes without splitting a character."""
+    while (s[n] & 0xC0) == 0x80:
+        n -= 1
+    return s[:n]
+
+
 class HistoryTagHelper:
     @staticmethod
     def split_utf8(s: bytes, n: int) -> Generator[bytes, None, None]:
@@ -460,11 +506,9 @@ class HistoryTagHelper:
         https://stackoverflow.com/questions/6043463/
         """
         while len(s) > n:
-            k = n
-            while (s[k] & 0xC0) == 0x80:
-                k -= 1
-            yield s[:k]
-            s = s[k:]
+            chunk = _truncate_utf8(s, n)
+            yield chunk
+            s = s[len(chunk) :]
         yield s
 
     @staticmethod
@@ -482,8 +526,7 @@ class HistoryTagHelper:
         Returns:
             bytes: The bytes representation of the history tag.
         """
-        htag_body = next(HistoryTagHelper.split_utf8(history_tag.encode("utf-8"), 21))
-        htag_prefix = bytes([len(htag_body)])
-        htag_suffix = bytes([0]) * (22 - len(htag_prefix + htag_body))
-        htag = htag_prefix + htag_body + htag_suffix
-        return htag
+        htag_body = history_tag.encode("utf-8")
+        if len(htag_body) > 21:
+            htag_body = _truncate_utf8(htag_body, 21)
+        return _HISTORY_TAG.pack(len(htag_body), htag_body)
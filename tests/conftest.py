@@ -0,0 +1,63 @@
+"""Fixtures shared by the tests of the device classes.
+
+A test module that uses `transmit` has to provide a `device_class` fixture
+returning the device class under test.
+"""
+
+import sys
+from unittest.mock import MagicMock
+
+import pytest
+
+from pysesameos2.crypto import BleCipher
+from pysesameos2.device import CHDeviceKey
+
+if sys.version_info[:2] < (3, 8):
+    from asynctest import CoroutineMock as AsyncMock
+else:
+    from unittest.mock import AsyncMock
+
+
+@pytest.fixture
+def sesame_token():
+    return bytes.fromhex("ffffffff")
+
+
+@pytest.fixture
+def device_key():
+    k = CHDeviceKey()
+    k.setSecretKey("34344f4734344b3534344f4934344f47")
+    k.setSesame2PublicKey(
+        "4beeaef8baabbd0198d606847364dfe3c324552d45fab9e538a1af8e04729279"
+        "000644fce039621d3ae37303379c1114efbc8186bd7229093caae446751e7ef6"
+    )
+    return k
+
+
+@pytest.fixture
+def publish_initial(sesame_token):
+    # ItemCode=BleItemCode.initial, followed by the token of the device.
+    return bytes.fromhex("0e") + sesame_token
+
+
+@pytest.fixture
+def notify_publish_initial(publish_initial):
+    # A single plaintext segment holding an OpCode=BleOpCode.publish notification.
+    return bytes.fromhex("0308") + publish_initial
+
+
+@pytest.fixture
+def notify_ciphertext():
+    # A single ciphertext segment, its content is decided by `ble_cipher`.
+    return bytes.fromhex("050702")
+
+
+@pytest.fixture
+def ble_cipher():
+    # A spec'd mock is enough: the device only calls decrypt() on its own cipher.
+    return MagicMock(spec=BleCipher)
+
+
+@pytest.fixture
+def transmit(mocker, device_class):
+    return mocker.patch.object(device_class, "transmit", new_callable=AsyncMock)
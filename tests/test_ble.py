@@ -26,38 +26,130 @@ from pysesameos2.const import (
     BleItemCode,
     BleOpCode,
 )
-from pysesameos2.helper import (
-    CHProductModel,
-    CHSesame2MechSettings,
-    CHSesame2MechStatus,
-)
+from pysesameos2.helper import CHProductModel
 
 if sys.version_info[:2] < (3, 8):
+    from asynctest import CoroutineMock as AsyncMock
     from asynctest import patch
 else:
-    from unittest.mock import patch
-
-
-@pytest.fixture
-def bleak_scanner():
+    from unittest.mock import AsyncMock, patch
+
+# A 40-byte plaintext payload and the three packets it is split into.
+_PAYLOAD = bytes.fromhex("feed" * 20)
+_FIRST_CHUNK = bytes.fromhex("01" + "feed" * 9 + "fe")
+_SECOND_CHUNK = bytes.fromhex("00ed" + "feed" * 9)
+_THIRD_CHUNK = bytes.fromhex("02feed")
+
+# Advertised service UUIDs of a SESAME device and of an unrelated device.
+_SESAME_UUIDS = ("0000fd81-0000-1000-8000-00805f9b34fb",)
+_UNKNOWN_UUIDS = ("ffffffff-0000-1000-8000-00805f9b34fb",)
+
+# Advertised manufacturer data of a registered SESAME3, an unknown product
+# model and a registered SESAME bot. BLEAdvertisement only reads these.
+_SS2_MANUFACTURER_DATA = {1370: b"\x00\x00\x01"}
+_UNKNOWN_MANUFACTURER_DATA = {1370: b"\xff\x00\x01"}
+_BOT_MANUFACTURER_DATA = {1370: b"\x02\x00\x01"}
+
+# The device ID advertised as "QpGK0YFUSv+9H/DN6IqN4Q".
+_SESAME2_DEVICE_ID = uuid.UUID("42918ad1-8154-4aff-bd1f-f0cde88a8de1")
+
+
+# Scan results whose advertisement cannot be parsed.
+_BROKEN_BLEDS = [
+    BLEDevice(
+        "AA:BB:CC:11:22:33",
+        "INVALID_NAME",
+        uuids=_SESAME_UUIDS,
+        rssi=-60,
+        manufacturer_data=_SS2_MANUFACTURER_DATA,
+    ),
+    BLEDevice(
+        "AA:BB:CC:44:55:66",
+        None,
+        uuids=_SESAME_UUIDS,
+        rssi=-60,
+        manufacturer_data=_SS2_MANUFACTURER_DATA,
+    ),
+    BLEDevice(
+        "AA:BB:CC:77:88:99",
+        "QpGK0YFUSv+9H/DN6IqN4Q",
+        uuids=_SESAME_UUIDS,
+        rssi=-60,
+    ),
+    BLEDevice(
+        "AA:BB:CC:AA:BB:CC",
+        "QpGK0YFUSv+9H/DN6IqN4Q",
+        rssi=-60,
+        manufacturer_data=_BOT_MANUFACTURER_DATA,
+    ),
+    BLEDevice(
+        "AA:BB:CC:DD:EE:FF",
+        "QpGK0YFUSv+9H/DN6IqN4Q",
+        uuids=_UNKNOWN_UUIDS,
+        rssi=-60,
+        manufacturer_data=_BOT_MANUFACTURER_DATA,
+    ),
+]
+_BROKEN_BLED_IDS = [
+    "invalid_name",
+    "no_name",
+    "no_manufacturer_data",
+    "no_uuids",
+    "bad_uuid",
+]
+
+
+@pytest.fixture(scope="module")
+def sesame2_bled():
+    """A registered SESAME3 as seen by a scan."""
+    return BLEDevice(
+        "AA:BB:CC:11:22:33",
+        "QpGK0YFUSv+9H/DN6IqN4Q",
+        uuids=_SESAME_UUIDS,
+        rssi=-60,
+        manufacturer_data=_SS2_MANUFACTURER_DATA,
+    )
+
+
+@pytest.fixture(scope="module")
+def unsupported_bled():
+    """A SESAME device of an unknown product model."""
+    return BLEDevice(
+        "AA:BB:CC:11:22:33",
+        "QpGK0YFUSv+9H/DN6IqN4Q",
+        uuids=_SESAME_UUIDS,
+        rssi=-60,
+        manufacturer_data=_UNKNOWN_MANUFACTURER_DATA,
+    )
+
+
+@pytest.fixture(scope="module")
+def _patched_bleak_scanner():
     with patch("pysesameos2.ble.BleakScanner") as scanner:
         yield scanner
 
 
-class TestCHSesame2BleTransmiter:
-    def test_CHSesame2BleTransmiter_raises_exception_on_missing_arguments(self):
-        with pytest.raises(TypeError):
-            CHSesame2BleTransmiter()
-
-        with pytest.raises(TypeError):
-            CHSesame2BleTransmiter(BleCommunicationType.plaintext)
+@pytest.fixture
+def bleak_scanner(_patched_bleak_scanner):
+    # The patch is shared by the whole module, so hand every test a clean mock.
+    _patched_bleak_scanner.reset_mock(return_value=True, side_effect=True)
+    _patched_bleak_scanner.discover.reset_mock(return_value=True, side_effect=True)
+    return _patched_bleak_scanner
 
-    def test_CHSesame2BleTransmiter_raises_exception_on_invalid_arguments(self):
-        with pytest.raises(TypeError):
-            CHSesame2BleTransmiter("INVALID", bytes([0]))
 
+class TestCHSesame2BleTransmiter:
+    @pytest.mark.parametrize(
+        "args",
+        [
+            (),
+            (BleCommunicationType.plaintext,),
+            ("INVALID", bytes([0])),
+            (BleCommunicationType.plaintext, "INVALID"),
+        ],
+    )
+    def test_CHSesame2BleTransmiter_raises_exception_on_invalid_arguments(self, args):
         with pytest.raises(TypeError):
-            CHSesame2BleTransmiter(BleCommunicationType.plaintext, "INVALID")
+            CHSesame2BleTransmiter(*args)
 
     def test_CHSesame2BleTransmiter(self):
         segment_type = BleCommunicationType.plaintext
@@ -66,19 +158,31 @@ class TestCHSesame2BleTransmiter:
 
     def test_CHSesame2BleTransmiter_getChunk(self):
         segment_type = BleCommunicationType.plaintext
-        data = bytes.fromhex("feed" * 20)
+        t = CHSesame2BleTransmiter(segment_type, _PAYLOAD)
+
+        assert len(_FIRST_CHUNK) == 20
+        assert len(_SECOND_CHUNK) == 20
+
+        assert t.getChunk() == _FIRST_CHUNK
+        assert t.getChunk() == _SECOND_CHUNK
+        assert t.getChunk() == _THIRD_CHUNK
+        assert t.getChunk() is None
+
+    def test_CHSesame2BleTransmiter_getChunk_single_packet(self):
+        segment_type = BleCommunicationType.ciphertext
+        data = bytes.fromhex("feedfeed")
         t = CHSesame2BleTransmiter(segment_type, data)
 
-        first_chunk = bytes.fromhex("01" + "feed" * 9 + "fe")
-        second_chunk = bytes.fromhex("00ed" + "feed" * 9)
-        third_chunk = bytes.fromhex("02feed")
+        assert t.getChunk() == bytes.fromhex("05feedfeed")
+        assert t.getChunk() is None
 
-        assert len(first_chunk) == 20
-        assert len(second_chunk) == 20
+    def test_CHSesame2BleTransmiter_iter(self):
+        segment_type = BleCommunicationType.plaintext
+        t = CHSesame2BleTransmiter(segment_type, _PAYLOAD)
 
-        assert t.getChunk() == first_chunk
-        assert t.getChunk() == second_chunk
-        assert t.getChunk() == third_chunk
+        assert t.getChunk() == _FIRST_CHUNK
+        assert list(t) == [_SECOND_CHUNK, _THIRD_CHUNK]
+        assert list(t) == []
         assert t.getChunk() is None
 
 
@@ -86,84 +190,79 @@ class TestCHSesame2BleReceiver:
     def test_CHSesame2BleReceiver_feed(self):
         r = CHSesame2BleReceiver()
 
-        first_chunk = bytes.fromhex("01" + "feed" * 9 + "fe")
-        second_chunk = bytes.fromhex("00ed" + "feed" * 9)
-        third_chunk = bytes.fromhex("02feed")
-
-        assert r.feed(first_chunk) == (None, None)
-        assert r.feed(second_chunk) == (None, None)
-        assert r.feed(third_chunk) == (
-            BleCommunicationType.plaintext,
-            bytes.fromhex("feed" * 20),
-        )
+        assert r.feed(_FIRST_CHUNK) == (None, None)
+        assert r.feed(_SECOND_CHUNK) == (None, None)
+        assert r.feed(_THIRD_CHUNK) == (BleCommunicationType.plaintext, _PAYLOAD)
 
+    def test_CHSesame2BleReceiver_feed_memoryview(self):
+        r = CHSesame2BleReceiver()
 
-class TestCHSesame2BlePayload:
-    def test_CHSesame2BlePayload_raises_exception_on_missing_arguments(self):
-        with pytest.raises(TypeError):
-            CHSesame2BlePayload()
+        first_chunk = bytearray(_FIRST_CHUNK)
+        second_chunk = bytearray.fromhex("02ed")
 
-    def test_CHSesame2BlePayload_raises_exception_on_invalid_arguments(self):
-        with pytest.raises(TypeError):
-            CHSesame2BlePayload("INVALID", BleItemCode.initial, bytes([0]))
+        assert r.feed(memoryview(first_chunk)) == (None, None)
+        segment_type, payload = r.feed(memoryview(second_chunk))
+        assert segment_type is BleCommunicationType.plaintext
+        assert isinstance(payload, bytes)
+        assert payload == bytes.fromhex("feed" * 10)
 
-        with pytest.raises(TypeError):
-            CHSesame2BlePayload(BleOpCode.read, "INVALID", bytes([0]))
 
+class TestCHSesame2BlePayload:
+    @pytest.mark.parametrize(
+        "args",
+        [
+            (),
+            ("INVALID", BleItemCode.initial, bytes([0])),
+            (BleOpCode.read, "INVALID", bytes([0])),
+            (BleOpCode.read, BleItemCode.initial, "INVALID"),
+        ],
+    )
+    def test_CHSesame2BlePayload_raises_exception_on_invalid_arguments(self, args):
         with pytest.raises(TypeError):
-            CHSesame2BlePayload(BleOpCode.read, BleItemCode.initial, "INVALID")
+            CHSesame2BlePayload(*args)
 
     def test_CHSesame2BlePayload(self):
         p = CHSesame2BlePayload(BleOpCode.read, BleItemCode.history, bytes([1]))
 
         assert p.getOpCode() == BleOpCode.read
         assert p.getItCode() == BleItemCode.history
-        assert p.toDataWithHeader() == bytes.fromhex("020401")
+        assert p.toDataWithHeader() == b"\x02\x04\x01"
 
 
 class TestCHSesame2BleNotify:
-    def test_CHSesame2BleNotify_raises_exception_on_missing_arguments(self):
-        with pytest.raises(TypeError):
-            CHSesame2BleNotify()
-
-    def test_CHSesame2BleNotify_raises_exception_on_invalid_arguments(self):
+    @pytest.mark.parametrize("args", [(), ("INVALID-DATA",)])
+    def test_CHSesame2BleNotify_raises_exception_on_invalid_arguments(self, args):
         with pytest.raises(TypeError):
-            CHSesame2BleNotify("INVALID-DATA")
+            CHSesame2BleNotify(*args)
 
     def test_CHSesame2BleNotify(self):
-        n = CHSesame2BleNotify(bytes.fromhex("07040205"))
+        n = CHSesame2BleNotify(b"\x07\x04\x02\x05")
 
         assert n.getNotifyOpCode() == BleOpCode.response
-        assert n.getPayload() == bytes.fromhex("040205")
+        assert n.getPayload() == b"\x04\x02\x05"
 
 
 class TestCHSesame2BlePublish:
-    def test_CHSesame2BlePublish_raises_exception_on_missing_arguments(self):
+    @pytest.mark.parametrize("args", [(), ("INVALID-DATA",)])
+    def test_CHSesame2BlePublish_raises_exception_on_invalid_arguments(self, args):
         with pytest.raises(TypeError):
-            CHSesame2BlePublish()
-
-    def test_CHSesame2BlePublish_raises_exception_on_invalid_arguments(self):
-        with pytest.raises(TypeError):
-            CHSesame2BlePublish("INVALID-DATA")
+            CHSesame2BlePublish(*args)
 
     def test_CHSesame2BlePublish(self):
-        p = CHSesame2BlePublish(bytes.fromhex("515d030080e6010002"))
+        p = CHSesame2BlePublish(b"\x51\x5d\x03\x00\x80\xe6\x01\x00\x02")
 
         assert p.getCmdItCode() == BleItemCode.mechStatus
-        assert p.getPayload() == bytes.fromhex("5d030080e6010002")
+        assert p.getPayload() == b"\x5d\x03\x00\x80\xe6\x01\x00\x02"
 
 
 class TestCHSesame2BleResponse:
-    def test_CHSesame2BleResponse_raises_exception_on_missing_arguments(self):
-        with pytest.raises(TypeError):
-            CHSesame2BleResponse()
-
-    def test_CHSesame2BleResponse_raises_exception_on_invalid_arguments(self):
+    @pytest.mark.parametrize("args", [(), ("INVALID-DATA",)])
+    def test_CHSesame2BleResponse_raises_exception_on_invalid_arguments(self, args):
         with pytest.raises(TypeError):
-            CHSesame2BleResponse("INVALID-DATA")
+            CHSesame2BleResponse(*args)
 
     def test_CHSesame2BleResponse(self):
-        r = CHSesame2BleResponse(bytes.fromhex("040205"))
+        r = CHSesame2BleResponse(b"\x04\x02\x05")
 
         assert r.getCmdItCode() == BleItemCode.history
         assert r.getCmdOPCode() == BleOpCode.read
@@ -172,42 +271,44 @@ class TestCHSesame2BleResponse:
 
 
 class TestBLEAdvertisement:
-    def test_BLEAdvertisement_raises_exception_on_missing_arguments(self):
+    @pytest.mark.parametrize(
+        "args",
+        [
+            (),
+            (BLEDevice("AA:BB:CC:11:22:33", "QpGK0YFUSv+9H/DN6IqN4Q"),),
+            ("INVALID-DATA", _SS2_MANUFACTURER_DATA),
+            (BLEDevice("AA:BB:CC:11:22:33", "QpGK0YFUSv+9H/DN6IqN4Q"), "INVALID"),
+        ],
+    )
+    def test_BLEAdvertisement_raises_exception_on_invalid_arguments(self, args):
         with pytest.raises(TypeError):
-            BLEAdvertisement()
+            BLEAdvertisement(*args)
 
-        with pytest.raises(TypeError):
-            BLEAdvertisement(BLEDevice("AA:BB:CC:11:22:33", "QpGK0YFUSv+9H/DN6IqN4Q"))
-
-    def test_BLEAdvertisement_raises_exception_on_invalid_arguments(self):
-        with pytest.raises(TypeError):
-            BLEAdvertisement("INVALID-DATA", {1370: b"\x00\x00\x01"})
-
-        with pytest.raises(TypeError):
-            BLEAdvertisement(
-                BLEDevice("AA:BB:CC:11:22:33", "QpGK0YFUSv+9H/DN6IqN4Q"),
-                "INVALID",
-            )
-
-    def test_BLEAdvertisement(self):
-        d = BLEDevice(
-            "AA:BB:CC:11:22:33",
-            "QpGK0YFUSv+9H/DN6IqN4Q",
-            uuids=[
-                "0000fd81-0000-1000-8000-00805f9b34fb",
-            ],
-            rssi=-60,
-            manufacturer_data={1370: b"\x00\x00\x01"},
-        )
-        b = BLEAdvertisement(dev=d, manufacturer_data={1370: b"\x00\x00\x01"})
+    def test_BLEAdvertisement(self, sesame2_bled):
+        d = sesame2_bled
+        b = BLEAdvertisement(dev=d, manufacturer_data=_SS2_MANUFACTURER_DATA)
 
         assert b.getAddress() == "AA:BB:CC:11:22:33"
         assert b.getDevice() == d
         assert b.getRssi() == -60
-        assert b.getDeviceID() == uuid.UUID("42918ad1-8154-4aff-bd1f-f0cde88a8de1")
+        assert b.getDeviceID() == _SESAME2_DEVICE_ID
         assert b.getProductModel() == CHProductModel.SS2
         assert b.isRegistered()
 
+    def test_BLEAdvertisement_WM2(self):
+        adv = b"\x01\x00\x00\x11\x22\x33\x44\x55\x66"
+        d = BLEDevice(
+            "AA:BB:CC:11:22:34",
+            "WM2",
+            rssi=-60,
+            manufacturer_data={1370: adv},
+        )
+        b = BLEAdvertisement(dev=d, manufacturer_data={1370: adv})
+
+        assert b.getDeviceID() == uuid.UUID("00000000-055a-fd81-0001-112233445566")
+        assert b.getProductModel() == CHProductModel.WM2
+        assert not b.isRegistered()
+
 
 class TestCHBleManager:
     def test_CHBleManager_device_factory_raises_exception_on_missing_arguments(self):
@@ -218,103 +319,85 @@ class TestCHBleManager:
         with pytest.raises(TypeError):
             CHBleManager().device_factory("INVALID-DATA")
 
-    def test_CHBleManager_device_factory_not_supported_device(self):
-        bled = BLEDevice(
-            "AA:BB:CC:11:22:33",
-            "QpGK0YFUSv+9H/DN6IqN4Q",
-            uuids=[
-                "0000fd81-0000-1000-8000-00805f9b34fb",
-            ],
-            rssi=-60,
-            manufacturer_data={1370: b"\xff\x00\x01"},
-        )
-
+    def test_CHBleManager_device_factory_not_supported_device(self, unsupported_bled):
         with pytest.raises(NotImplementedError):
-            assert CHBleManager().device_factory(bled)
-
-    def test_CHBleManager_device_factory(self):
+            assert CHBleManager().device_factory(unsupported_bled)
+
+    @pytest.mark.parametrize(
+        "uuids, manufacturer_data",
+        [
+            pytest.param(_SESAME_UUIDS, {}, id="no_manufacturer_data"),
+            pytest.param([], _SS2_MANUFACTURER_DATA, id="no_uuids"),
+            pytest.param(
+                ["0000180f-0000-1000-8000-00805f9b34fb"],
+                _SS2_MANUFACTURER_DATA,
+                id="bad_uuid",
+            ),
+        ],
+    )
+    def test_CHBleManager_device_factory_raises_exception_on_broken_metadata(
+        self, uuids, manufacturer_data
+    ):
         bled = BLEDevice(
             "AA:BB:CC:11:22:33",
             "QpGK0YFUSv+9H/DN6IqN4Q",
-            uuids=[
-                "0000fd81-0000-1000-8000-00805f9b34fb",
-            ],
+            uuids=uuids,
             rssi=-60,
-            manufacturer_data={1370: b"\x00\x00\x01"},
+            manufacturer_data=manufacturer_data,
         )
 
-        d = CHBleManager().device_factory(bled)
+        with pytest.raises(ValueError):
+            CHBleManager().device_factory(bled)
+
+    def test_CHBleManager_device_factory(self, sesame2_bled):
+        d = CHBleManager().device_factory(sesame2_bled)
         assert isinstance(d, CHSesame2)
 
-    @pytest.mark.asyncio
-    async def test_CHBleManager_scan_returns_None(self, bleak_scanner):
-        async def _scan(*args, **kwargs):
-            """Simulate a scanning response"""
-            return [
-                BLEDevice(
-                    "AA:BB:CC:11:22:33",
-                    "QpGK0YFUSv+9H/DN6IqN4Q",
-                    uuids=[
-                        "0000fd81-0000-1000-8000-00805f9b34fb",
-                    ],
-                    rssi=-60,
-                    manufacturer_data={1370: b"\xff\x00\x01"},
-                ),
+
+class TestCHBleManagerScan:
+    pytestmark = pytest.mark.asyncio
+
+    async def test_CHBleManager_scan_returns_None(
+        self, bleak_scanner, unsupported_bled
+    ):
+        bleak_scanner.discover = AsyncMock(
+            return_value=[
+                unsupported_bled,
                 BLEDevice(
                     "AA:BB:CC:44:55:66",
                     "QpGK0YFUSv+9H/DN6IqN4Q",
-                    uuids=[
-                        "ffffffff-0000-1000-8000-00805f9b34fb",
-                    ],
+                    uuids=_UNKNOWN_UUIDS,
                     rssi=-60,
-                    manufacturer_data={1370: b"\x00\x00\x01"},
+                    manufacturer_data=_SS2_MANUFACTURER_DATA,
                 ),
             ]
-
-        bleak_scanner.discover.side_effect = _scan
+        )
 
         assert await CHBleManager().scan() == {}
 
         bleak_scanner.discover.assert_called_once()
 
-    @pytest.mark.asyncio
     async def test_CHBleManager_scan_pass_BleakError_exception(self, bleak_scanner):
-        async def raise_exception(*args, **kwargs):
-            raise BleakError("TEST")
-
-        bleak_scanner.discover.side_effect = raise_exception
+        bleak_scanner.discover = AsyncMock(side_effect=BleakError("TEST"))
 
         devices = await CHBleManager().scan()
         assert len(devices) == 0
 
         bleak_scanner.discover.assert_called_once()
 
-    @pytest.mark.asyncio
-    async def test_CHBleManager_scan(self, bleak_scanner):
-        async def _scan(*args, **kwargs):
-            """Simulate a scanning response"""
-            return [
-                BLEDevice(
-                    "AA:BB:CC:11:22:33",
-                    "QpGK0YFUSv+9H/DN6IqN4Q",
-                    uuids=[
-                        "0000fd81-0000-1000-8000-00805f9b34fb",
-                    ],
-                    rssi=-60,
-                    manufacturer_data={1370: b"\x00\x00\x01"},
-                ),
+    async def test_CHBleManager_scan(self, bleak_scanner, sesame2_bled):
+        bleak_scanner.discover = AsyncMock(
+            return_value=[
+                sesame2_bled,
                 BLEDevice(
                     "AA:BB:CC:44:55:66",
                     "Em09ZpIiTlq83gxmKdSNQw",
-                    uuids=[
-                        "0000fd81-0000-1000-8000-00805f9b34fb",
-                    ],
+                    uuids=_SESAME_UUIDS,
                     rssi=-70,
-                    manufacturer_data={1370: b"\x00\x00\x01"},
+                    manufacturer_data=_SS2_MANUFACTURER_DATA,
                 ),
             ]
-
-        bleak_scanner.discover.side_effect = _scan
+        )
 
         devices = await CHBleManager().scan()
 
@@ -322,136 +405,53 @@ class TestCHBleManager:
         assert "AA:BB:CC:11:22:33" in devices
         assert "AA:BB:CC:44:55:66" in devices
 
-        bleak_scanner.discover.assert_called_once()
+        bleak_scanner.discover.assert_called_once_with(
+            service_uuids=["0000fd81-0000-1000-8000-00805f9b34fb"]
+        )
 
-    @pytest.mark.asyncio
     async def test_CHBleManager_scan_by_address_raises_exception_on_device_missing(
         self, bleak_scanner
     ):
-        async def _scan(*args, **kwargs):
-            """Simulate a scanning response"""
-            return []
-
-        bleak_scanner.discover.side_effect = _scan
+        bleak_scanner.discover = AsyncMock(return_value=[])
 
         with pytest.raises(ConnectionRefusedError):
             await CHBleManager().scan_by_address("AA:BB:CC:11:22:33")
 
         bleak_scanner.discover.assert_called_once()
 
-    @pytest.mark.asyncio
+    @pytest.mark.parametrize("bled", _BROKEN_BLEDS, ids=_BROKEN_BLED_IDS)
     async def test_CHBleManager_scan_by_address_raises_exception_on_broken_advertisement(
-        self, bleak_scanner
+        self, bleak_scanner, bled
     ):
-        async def _scan(*args, **kwargs):
-            """Simulate a scanning response"""
-            return [
-                BLEDevice(
-                    "AA:BB:CC:11:22:33",
-                    "INVALID_NAME",
-                    uuids=[
-                        "0000fd81-0000-1000-8000-00805f9b34fb",
-                    ],
-                    rssi=-60,
-                    manufacturer_data={1370: b"\x00\x00\x01"},
-                ),
-                BLEDevice(
-                    "AA:BB:CC:44:55:66",
-                    None,
-                    uuids=[
-                        "0000fd81-0000-1000-8000-00805f9b34fb",
-                    ],
-                    rssi=-60,
-                    manufacturer_data={1370: b"\x00\x00\x01"},
-                ),
-                BLEDevice(
-                    "AA:BB:CC:77:88:99",
-                    "QpGK0YFUSv+9H/DN6IqN4Q",
-                    uuids=[
-                        "0000fd81-0000-1000-8000-00805f9b34fb",
-                    ],
-                    rssi=-60,
-                ),
-                BLEDevice(
-                    "AA:BB:CC:AA:BB:CC",
-                    "QpGK0YFUSv+9H/DN6IqN4Q",
-                    rssi=-60,
-                    manufacturer_data={1370: b"\x02\x00\x01"},
-                ),
-                BLEDevice(
-                    "AA:BB:CC:DD:EE:FF",
-                    "QpGK0YFUSv+9H/DN6IqN4Q",
-                    uuids=[
-                        "ffffffff-0000-1000-8000-00805f9b34fb",
-                    ],
-                    rssi=-60,
-                    manufacturer_data={1370: b"\x02\x00\x01"},
-                ),
-            ]
-
-        bleak_scanner.discover.side_effect = _scan
-
-        with pytest.raises(ValueError):
-            await CHBleManager().scan_by_address("AA:BB:CC:11:22:33")
-
-        with pytest.raises(ValueError):
-            await CHBleManager().scan_by_address("AA:BB:CC:44:55:66")
-
-        with pytest.raises(ValueError):
-            await CHBleManager().scan_by_address("AA:BB:CC:77:88:99")
-
-        with pytest.raises(ValueError):
-            await CHBleManager().scan_by_address("AA:BB:CC:AA:BB:CC")
+        bleak_scanner.discover = AsyncMock(return_value=[bled])
 
         with pytest.raises(ValueError):
-            await CHBleManager().scan_by_address("AA:BB:CC:DD:EE:FF")
+            await CHBleManager().scan_by_address(bled.address)
 
-        assert bleak_scanner.discover.call_count == 5
+        bleak_scanner.discover.assert_called_once()
 
-    @pytest.mark.asyncio
     async def test_CHBleManager_scan_by_address_raises_exception_for_non_supported_device(
-        self, bleak_scanner
+        self, bleak_scanner, unsupported_bled
     ):
-        async def _scan(*args, **kwargs):
-            """Simulate a scanning response"""
-            return [
-                BLEDevice(
-                    "AA:BB:CC:11:22:33",
-                    "QpGK0YFUSv+9H/DN6IqN4Q",
-                    uuids=[
-                        "0000fd81-0000-1000-8000-00805f9b34fb",
-                    ],
-                    rssi=-60,
-                    manufacturer_data={1370: b"\xff\x00\x01"},
-                )
-            ]
-
-        bleak_scanner.discover.side_effect = _scan
+        bleak_scanner.discover = AsyncMock(return_value=[unsupported_bled])
 
         with pytest.raises(NotImplementedError):
             await CHBleManager().scan_by_address("AA:BB:CC:11:22:33")
 
         bleak_scanner.discover.assert_called_once()
 
-    @pytest.mark.asyncio
-    async def test_CHBleManager_scan_by_address(self, bleak_scanner):
-        async def _scan(*args, **kwargs):
-            """Simulate a scanning response"""
-            return [
-                BLEDevice(
-                    "AA:BB:CC:11:22:33",
-                    "QpGK0YFUSv+9H/DN6IqN4Q",
-                    uuids=[
-                        "0000fd81-0000-1000-8000-00805f9b34fb",
-                    ],
-                    rssi=-60,
-                    manufacturer_data={1370: b"\x00\x00\x01"},
-                )
-            ]
+    async def test_CHBleManager_scan_by_address(
+        self, bleak_scanner, mocker, sesame2_bled
+    ):
+        bleak_scanner.discover = AsyncMock(return_value=[sesame2_bled])
 
-        bleak_scanner.discover.side_effect = _scan
+        manager = CHBleManager()
+        spy = mocker.spy(manager, "device_factory")
 
-        device = await CHBleManager().scan_by_address("AA:BB:CC:11:22:33")
+        device = await manager.scan_by_address("aa:bb:cc:11:22:33")
         assert isinstance(device, CHSesame2)
+        spy.assert_called_once()
 
-        bleak_scanner.discover.assert_called_once()
+        bleak_scanner.discover.assert_called_once_with(
+            service_uuids=["0000fd81-0000-1000-8000-00805f9b34fb"]
+        )
@@ -2,9 +2,10 @@
 
 """Tests for `pysesameos2` package."""
 
-import sys
+from unittest.mock import MagicMock
 
 import pytest
+from bleak.backends.characteristic import BleakGATTCharacteristic
 
 from pysesameos2.ble import (
     CHSesame2BlePublish,
@@ -13,18 +14,32 @@ from pysesameos2.ble import (
 )
 from pysesameos2.chsesame2 import CHSesame2, CHSesame2BleLoginResponse
 from pysesameos2.const import BleCommunicationType, CHSesame2Intention, CHSesame2Status
-from pysesameos2.crypto import BleCipher
-from pysesameos2.device import CHDeviceKey
 from pysesameos2.helper import (
     CHProductModel,
     CHSesame2MechSettings,
     CHSesame2MechStatus,
 )
 
-if sys.version_info[:2] < (3, 8):
-    from asynctest import patch
-else:
-    from unittest.mock import patch
+_SESAME2_MECH_SETTING = bytes.fromhex("e30105034d0179026f029b03")
+
+
+@pytest.fixture(scope="module")
+def sesame2_mech_setting():
+    """The parsed settings are immutable, so one instance serves the whole module."""
+    return CHSesame2MechSettings(_SESAME2_MECH_SETTING)
+
+
+@pytest.fixture
+def configured_sesame2(sesame2_mech_setting):
+    # The device itself holds per-connection state, so it is never shared.
+    s = CHSesame2()
+    s.setMechSetting(sesame2_mech_setting)
+    return s
+
+
+@pytest.fixture
+def device_class():
+    return CHSesame2
 
 
 class TestCHSesame2BleLoginResponse:
@@ -49,6 +64,9 @@ class TestCHSesame2BleLoginResponse:
 
 
 class TestCHSesame2:
+    def test_CHSesame2_has_no_instance_dict(self):
+        assert not hasattr(CHSesame2(), "__dict__")
+
     def test_CHSesame2_RxBuffer(self):
         s = CHSesame2()
 
@@ -65,85 +83,104 @@ class TestCHSesame2:
         ble_transmitter = CHSesame2BleTransmiter(segment_type, data)
 
         assert s.setTxBuffer(ble_transmitter) is None
-        assert s.getTxBuffer() == ble_transmitter
-
-    def test_CHSesame2_MechStatus_exception_on_emtry_arguments(self):
-        with pytest.raises(TypeError):
-            CHSesame2MechStatus()
-
-    def test_CHSesame2_MechStatus_raises_exception_on_invalid_argument(self):
-        with pytest.raises(ValueError):
-            CHSesame2MechStatus("INVALID")
-
-        with pytest.raises(TypeError):
-            CHSesame2MechStatus(10)
+        assert s.getTxBuffer() is ble_transmitter
+
+    @pytest.mark.parametrize(
+        "args, exception",
+        [((), TypeError), (("INVALID",), ValueError), ((10,), TypeError)],
+    )
+    def test_CHSesame2_MechStatus_raises_exception_on_invalid_argument(
+        self, args, exception
+    ):
+        with pytest.raises(exception):
+            CHSesame2MechStatus(*args)
 
+    @pytest.mark.parametrize("setter", ["setMechStatus", "setMechSetting"])
+    def test_CHSesame2_raises_exception_on_invalid_mech_object(self, setter):
         s = CHSesame2()
         with pytest.raises(TypeError):
-            s.setMechStatus("INVALID")
-
-    def test_CHSesame2_MechStatus_idle_before_setMechSetting(self):
+            getattr(s, setter)("INVALID")
+
+    @pytest.mark.parametrize(
+        "rawdata, intention",
+        [
+            ("5d0300801c020002", CHSesame2Intention.idle),
+            ("5d03050326020002", CHSesame2Intention.movingToUnknownTarget),
+        ],
+    )
+    def test_CHSesame2_MechStatus_before_setMechSetting(self, rawdata, intention):
         s = CHSesame2()
 
-        status = CHSesame2MechStatus("5d0300801c020002")
+        status = CHSesame2MechStatus(rawdata)
         assert s.setMechStatus(status) is None
         assert s.getMechStatus() == status
-        assert s.getIntention() == CHSesame2Intention.idle
-
-    def test_CHSesame2_MechStatus_idle(self):
-        s = CHSesame2()
-        s.setMechSetting(CHSesame2MechSettings("e30105034d0179026f029b03"))
-
-        status = CHSesame2MechStatus("5d0300801c020002")
+        assert s.getIntention() == intention
+
+    @pytest.mark.parametrize(
+        "rawdata, intention",
+        [
+            ("5d0300801c020002", CHSesame2Intention.idle),
+            ("5d03050326020002", CHSesame2Intention.unlocking),
+            ("5c03e301f0020004", CHSesame2Intention.locking),
+        ],
+    )
+    def test_CHSesame2_MechStatus(self, configured_sesame2, rawdata, intention):
+        s = configured_sesame2
+
+        status = CHSesame2MechStatus(rawdata)
         assert s.setMechStatus(status) is None
         assert s.getMechStatus() == status
-        assert s.getIntention() == CHSesame2Intention.idle
+        assert s.getIntention() == intention
 
-    def test_CHSesame2_MechStatus_unlocking_before_setMechSetting(self):
+    @pytest.mark.asyncio
+    async def test_CHSesame2_loginSesame(self, sesame_token, device_key, transmit):
         s = CHSesame2()
+        s.setSesameToken(sesame_token)
+        s.setKey(device_key)
 
-        status = CHSesame2MechStatus("5d03050326020002")
-        assert s.setMechStatus(status) is None
-        assert s.getIntention() == CHSesame2Intention.movingToUnknownTarget
+        assert (await s.loginSesame()) is None
+        transmit.assert_awaited_once()
 
-    def test_CHSesame2_MechStatus_unlocking(self):
+    @pytest.mark.asyncio
+    async def test_CHSesame2_loginSesame_twice(
+        self, sesame_token, device_key, transmit
+    ):
         s = CHSesame2()
-        s.setMechSetting(CHSesame2MechSettings("e30105034d0179026f029b03"))
-        s.setMechStatus(CHSesame2MechStatus("5d03050326020002"))
+        s.setSesameToken(sesame_token)
+        s.setKey(device_key)
 
-        assert s.getIntention() == CHSesame2Intention.unlocking
+        await s.loginSesame()
+        first = list(iter(s.getTxBuffer().getChunk, None))
+        await s.loginSesame()
+        second = list(iter(s.getTxBuffer().getChunk, None))
 
-    def test_CHSesame2_MechStatus_locking(self):
-        s = CHSesame2()
-        s.setMechSetting(CHSesame2MechSettings("e30105034d0179026f029b03"))
-        s.setMechStatus(CHSesame2MechStatus("5c03e301f0020004"))
-
-        assert s.getIntention() == CHSesame2Intention.locking
+        # The same key and tokens must give the same login request.
+        assert first == second
 
-    def test_CHSesame2_MechSetting_raises_exception_on_invalid_argument(self):
+    @pytest.mark.asyncio
+    async def test_CHSesame2_transmit_raises_exception_without_characteristic(self):
         s = CHSesame2()
-        with pytest.raises(TypeError):
-            s.setMechSetting("INVALID")
+
+        with pytest.raises(RuntimeError):
+            await s.transmit()
 
     @pytest.mark.asyncio
-    async def test_CHSesame2_loginSesame(self):
+    async def test_CHSesame2_transmit(self):
         s = CHSesame2()
-        s.setSesameToken(bytes.fromhex("ffffffff"))
+        mock_char = MagicMock(spec=BleakGATTCharacteristic)
+        s.setCharacteristicTX(mock_char)
+        s.setTxBuffer(CHSesame2BleTransmiter(BleCommunicationType.plaintext, bytes(20)))
 
-        k = CHDeviceKey()
-        k.setSecretKey("34344f4734344b3534344f4934344f47")
-        k.setSesame2PublicKey(
-            "4beeaef8baabbd0198d606847364dfe3c324552d45fab9e538a1af8e04729279000644fce039621d3ae37303379c1114efbc8186bd7229093caae446751e7ef6"
-        )
-        s.setKey(k)
+        written = []
 
-        with patch("pysesameos2.chsesame2.CHSesame2.transmit") as transmit:
+        async def _write(char, data, response):
+            written.append(data)
 
-            async def _transmit(*args, **kwargs):
-                pass
+        s._client = MagicMock()
+        s._client.write_gatt_char.side_effect = _write
 
-            transmit.side_effect = _transmit
-            assert (await s.loginSesame()) is None
+        assert (await s.transmit()) is None
+        assert written == [bytes.fromhex("01" + "00" * 19), bytes.fromhex("0200")]
 
     def test_CHSesame2_onConnectionStateChange(self):
         s = CHSesame2()
@@ -151,14 +188,16 @@ class TestCHSesame2:
         assert s.getDeviceStatus() == CHSesame2Status.NoBleSignal
 
     @pytest.mark.asyncio
-    async def test_CHSesame2_onCharacteristicChanged_plaintext_publish(self):
+    async def test_CHSesame2_onCharacteristicChanged_plaintext_publish(
+        self, notify_publish_initial, mocker
+    ):
         s = CHSesame2()
         s.setRegistered(True)
 
-        with patch("pysesameos2.chsesame2.CHSesame2.loginSesame") as login_sesame:
-            assert (
-                await s.onCharacteristicChanged(10, bytearray.fromhex("03080effffffff"))
-            ) is None
+        login_sesame = mocker.patch.object(CHSesame2, "loginSesame")
+        assert (
+            await s.onCharacteristicChanged(10, bytearray(notify_publish_initial))
+        ) is None
         login_sesame.assert_called_once()
         assert s.getSesameToken().hex() == "ffffffff"
 
@@ -177,59 +216,68 @@ class TestCHSesame2:
                 10, bytearray.fromhex("04ffffffffffffffffffffffffffffffffff")
             )
 
+    @pytest.mark.asyncio
+    async def test_CHSesame2_onCharacteristicChanged_unknown_segment_type(self):
+        s = CHSesame2()
+
+        with pytest.raises(ValueError):
+            await s.onCharacteristicChanged(10, bytearray.fromhex("07080effffffff"))
+
     @pytest.mark.asyncio
     async def test_CHSesame2_onCharacteristicChanged_ciphertext_login_success_with_non_configured_device(
-        self,
+        self, notify_ciphertext, ble_cipher
     ):
         s = CHSesame2()
 
-        with patch("pysesameos2.crypto.BleCipher", spec=BleCipher) as ble_cipher:
-            s.setCipher(ble_cipher)
-            ble_cipher.decrypt.return_value = bytes.fromhex(
-                "07020500f545d360ffffffffffffffffffffffffffffffffffffffffffffffff"
-            )
+        s.setCipher(ble_cipher)
+        ble_cipher.decrypt.return_value = bytes.fromhex(
+            "07020500f545d360ffffffffffffffffffffffffffffffffffffffffffffffff"
+        )
 
-            assert (
-                await s.onCharacteristicChanged(10, bytearray.fromhex("050702"))
-            ) is None
-            assert s.getDeviceStatus() == CHSesame2Status.NoSettings
+        assert (
+            await s.onCharacteristicChanged(10, bytearray(notify_ciphertext))
+        ) is None
+        assert s.getDeviceStatus() == CHSesame2Status.NoSettings
 
     @pytest.mark.asyncio
-    async def test_CHSesame2_onCharacteristicChanged_ciphertext_login_success(self):
+    async def test_CHSesame2_onCharacteristicChanged_ciphertext_login_success(
+        self, notify_ciphertext, ble_cipher
+    ):
         s = CHSesame2()
 
-        with patch("pysesameos2.crypto.BleCipher", spec=BleCipher) as ble_cipher:
-            s.setCipher(ble_cipher)
-            ble_cipher.decrypt.return_value = bytes.fromhex(
-                "07020500f545d36001008001e30105034d0179026f029b035e03008016020002"
-            )
+        s.setCipher(ble_cipher)
+        ble_cipher.decrypt.return_value = bytes.fromhex(
+            "07020500f545d36001008001e30105034d0179026f029b035e03008016020002"
+        )
 
-            assert (
-                await s.onCharacteristicChanged(10, bytearray.fromhex("050702"))
-            ) is None
-            assert s.getDeviceStatus() == CHSesame2Status.Locked
+        assert (
+            await s.onCharacteristicChanged(10, bytearray(notify_ciphertext))
+        ) is None
+        assert s.getDeviceStatus() == CHSesame2Status.Locked
 
     @pytest.mark.asyncio
     async def test_CHSesame2_onGattSesamePublish_initial_with_non_registered_device(
-        self,
+        self, publish_initial
     ):
         s = CHSesame2()
         s.setRegistered(False)
 
-        publish_payload = CHSesame2BlePublish(bytes.fromhex("0effffffff"))
+        publish_payload = CHSesame2BlePublish(publish_initial)
 
         with pytest.raises(NotImplementedError):
             await s.onGattSesamePublish(publish_payload)
 
     @pytest.mark.asyncio
-    async def test_CHSesame2_onGattSesamePublish_initial_with_registered_device(self):
+    async def test_CHSesame2_onGattSesamePublish_initial_with_registered_device(
+        self, publish_initial, mocker
+    ):
         s = CHSesame2()
         s.setRegistered(True)
 
-        publish_payload = CHSesame2BlePublish(bytes.fromhex("0effffffff"))
+        publish_payload = CHSesame2BlePublish(publish_initial)
 
-        with patch("pysesameos2.chsesame2.CHSesame2.loginSesame") as login_sesame:
-            assert (await s.onGattSesamePublish(publish_payload)) is None
+        login_sesame = mocker.patch.object(CHSesame2, "loginSesame")
+        assert (await s.onGattSesamePublish(publish_payload)) is None
         login_sesame.assert_called_once()
 
         assert s.getSesameToken().hex() == "ffffffff"
@@ -242,9 +290,11 @@ class TestCHSesame2:
         publish_payload = CHSesame2BlePublish(bytes.fromhex("5160030080f3ff0002"))
 
         assert (await s.onGattSesamePublish(publish_payload)) is None
-        assert str(s.getMechStatus()) == str(
-            CHSesame2MechStatus(rawdata="60030080f3ff0002")
-        )
+        status = s.getMechStatus()
+        assert status.getBatteryVoltage() == 6.0809384164222875
+        assert status.getPosition() == -13
+        assert status.getTarget() == -32768
+        assert status.isInLockRange()
         assert s.getDeviceStatus() == CHSesame2Status.Locked
 
         assert (
@@ -261,9 +311,20 @@ class TestCHSesame2:
         )
 
         assert (await s.onGattSesamePublish(publish_payload)) is None
-        assert str(s.getMechSetting()) == str(
-            CHSesame2MechSettings(rawdata="efff1c0159ff85008600b201")
-        )
+        setting = s.getMechSetting()
+        assert setting.getLockPosition() == -17
+        assert setting.getUnlockPosition() == 284
+
+    @pytest.mark.asyncio
+    async def test_CHSesame2_onGattSesamePublish_ignores_unhandled_item(self):
+        s = CHSesame2()
+
+        publish_payload = CHSesame2BlePublish(bytes.fromhex("05ffff"))
+
+        assert (await s.onGattSesamePublish(publish_payload)) is None
+        assert s.getSesameToken() is None
+        assert s.getMechSetting() is None
+        assert s.getMechStatus() is None
 
     @pytest.mark.asyncio
     async def test_CHSesame2_connect_raises_exception_before_setAdvertisement(self):
@@ -317,23 +378,23 @@ class TestCHSesame2:
             await s.toggle()
 
     @pytest.mark.asyncio
-    async def test_CHSesame2_toggle_to_unlocking(self):
+    async def test_CHSesame2_toggle_to_unlocking(self, mocker):
         s = CHSesame2()
         s.setDeviceStatus(CHSesame2Status.Locked)
         s.setMechStatus(CHSesame2MechStatus(rawdata="60030080f3ff0002"))
 
-        with patch("pysesameos2.chsesame2.CHSesame2.unlock") as unlock:
-            assert (await s.toggle()) is None
+        unlock = mocker.patch.object(CHSesame2, "unlock")
+        assert (await s.toggle()) is None
         unlock.assert_called_once()
 
     @pytest.mark.asyncio
-    async def test_CHSesame2_toggle_to_locking(self):
+    async def test_CHSesame2_toggle_to_locking(self, mocker):
         s = CHSesame2()
         s.setDeviceStatus(CHSesame2Status.Unlocked)
         s.setMechStatus(CHSesame2MechStatus(rawdata="5c030503e3020004"))
 
-        with patch("pysesameos2.chsesame2.CHSesame2.lock") as lock:
-            assert (await s.toggle()) is None
+        lock = mocker.patch.object(CHSesame2, "lock")
+        assert (await s.toggle()) is None
         lock.assert_called_once()
 
     # TODO: Develop tests for the methods which relate to BleakClient.
@@ -2,9 +2,10 @@
 
 """Tests for `pysesameos2` package."""
 
-import sys
+from unittest.mock import MagicMock
 
 import pytest
+from bleak.backends.characteristic import BleakGATTCharacteristic
 
 from pysesameos2.ble import (
     CHSesame2BlePublish,
@@ -13,8 +14,6 @@ from pysesameos2.ble import (
 )
 from pysesameos2.chsesamebot import CHSesameBot, CHSesameBotBleLoginResponse
 from pysesameos2.const import BleCommunicationType, CHSesame2Intention, CHSesame2Status
-from pysesameos2.crypto import BleCipher
-from pysesameos2.device import CHDeviceKey
 from pysesameos2.helper import (
     CHProductModel,
     CHSesameBotButtonMode,
@@ -23,10 +22,10 @@ from pysesameos2.helper import (
     CHSesameBotUserPreDir,
 )
 
-if sys.version_info[:2] < (3, 8):
-    from asynctest import patch
-else:
-    from unittest.mock import patch
+
+@pytest.fixture
+def device_class():
+    return CHSesameBot
 
 
 class TestCHSesameBotBleLoginResponse:
@@ -57,6 +56,9 @@ class TestCHSesameBotBleLoginResponse:
 
 
 class TestCHSesameBot:
+    def test_CHSesameBot_has_no_instance_dict(self):
+        assert not hasattr(CHSesameBot(), "__dict__")
+
     def test_CHSesameBot_RxBuffer(self):
         s = CHSesameBot()
 
@@ -73,83 +75,79 @@ class TestCHSesameBot:
         ble_transmitter = CHSesame2BleTransmiter(segment_type, data)
 
         assert s.setTxBuffer(ble_transmitter) is None
-        assert s.getTxBuffer() == ble_transmitter
-
-    def test_CHSesameBot_MechStatus_exception_on_emtry_arguments(self):
-        with pytest.raises(TypeError):
-            CHSesameBotMechStatus()
-
-    def test_CHSesameBot_MechStatus_raises_exception_on_invalid_argument(self):
-        with pytest.raises(ValueError):
-            CHSesameBotMechStatus("INVALID")
-
-        with pytest.raises(TypeError):
-            CHSesameBotMechStatus(10)
+        assert s.getTxBuffer() is ble_transmitter
+
+    @pytest.mark.parametrize(
+        "args, exception",
+        [((), TypeError), (("INVALID",), ValueError), ((10,), TypeError)],
+    )
+    def test_CHSesameBot_MechStatus_raises_exception_on_invalid_argument(
+        self, args, exception
+    ):
+        with pytest.raises(exception):
+            CHSesameBotMechStatus(*args)
 
+    @pytest.mark.parametrize("setter", ["setMechStatus", "setMechSetting"])
+    def test_CHSesameBot_raises_exception_on_invalid_mech_object(self, setter):
         s = CHSesameBot()
         with pytest.raises(TypeError):
-            s.setMechStatus("INVALID")
+            getattr(s, setter)("INVALID")
 
     def test_CHSesameBot_MechStatus_idle_as_initial_status(self):
         s = CHSesameBot()
         assert s.getIntention() == CHSesame2Intention.idle
 
-    def test_CHSesameBot_MechStatus_idle(self):
+    @pytest.mark.parametrize(
+        "rawdata, intention",
+        [
+            ("5703000000000004", CHSesame2Intention.idle),
+            ("5503000003000004", CHSesame2Intention.unlocking),
+            ("5703000001000002", CHSesame2Intention.locking),
+            ("5503000002000002", CHSesame2Intention.holding),
+            ("550300000f000002", CHSesame2Intention.movingToUnknownTarget),
+        ],
+    )
+    def test_CHSesameBot_MechStatus(self, rawdata, intention):
         s = CHSesameBot()
 
-        status = CHSesameBotMechStatus("5703000000000004")
+        status = CHSesameBotMechStatus(rawdata)
         assert s.setMechStatus(status) is None
         assert s.getMechStatus() == status
-        assert s.getIntention() == CHSesame2Intention.idle
+        assert s.getIntention() == intention
 
-    def test_CHSesameBot_MechStatus_unlocking(self):
-        s = CHSesameBot()
-        s.setMechStatus(CHSesameBotMechStatus("5503000003000004"))
-
-        assert s.getIntention() == CHSesame2Intention.unlocking
-
-    def test_CHSesameBot_MechStatus_locking(self):
-        s = CHSesameBot()
-        s.setMechStatus(CHSesameBotMechStatus("5703000001000002"))
-
-        assert s.getIntention() == CHSesame2Intention.locking
-
-    def test_CHSesameBot_MechStatus_holding(self):
+    @pytest.mark.asyncio
+    async def test_CHSesameBot_loginSesame(self, sesame_token, device_key, transmit):
         s = CHSesameBot()
-        s.setMechStatus(CHSesameBotMechStatus("5503000002000002"))
+        s.setSesameToken(sesame_token)
+        s.setKey(device_key)
 
-        assert s.getIntention() == CHSesame2Intention.holding
+        assert (await s.loginSesame()) is None
+        transmit.assert_awaited_once()
 
-    def test_CHSesameBot_MechStatus_movingToUnknownTarget(self):
+    @pytest.mark.asyncio
+    async def test_CHSesameBot_transmit_raises_exception_without_characteristic(self):
         s = CHSesameBot()
-        s.setMechStatus(CHSesameBotMechStatus("550300000f000002"))
-
-        assert s.getIntention() == CHSesame2Intention.movingToUnknownTarget
 
-    def test_CHSesameBot_MechSetting_raises_exception_on_invalid_argument(self):
-        s = CHSesameBot()
-        with pytest.raises(TypeError):
-            s.setMechSetting("INVALID")
+        with pytest.raises(RuntimeError):
+            await s.transmit()
 
     @pytest.mark.asyncio
-    async def test_CHSesameBot_loginSesame(self):
+    async def test_CHSesameBot_transmit(self):
         s = CHSesameBot()
-        s.setSesameToken(bytes.fromhex("ffffffff"))
+        mock_char = MagicMock(spec=BleakGATTCharacteristic)
+        s.setCharacteristicTX(mock_char)
+        s.setTxBuffer(CHSesame2BleTransmiter(BleCommunicationType.plaintext, bytes(20)))
 
-        k = CHDeviceKey()
-        k.setSecretKey("34344f4734344b3534344f4934344f47")
-        k.setSesame2PublicKey(
-            "4beeaef8baabbd0198d606847364dfe3c324552d45fab9e538a1af8e04729279000644fce039621d3ae37303379c1114efbc8186bd7229093caae446751e7ef6"
-        )
-        s.setKey(k)
+        written = []
 
-        with patch("pysesameos2.chsesamebot.CHSesameBot.transmit") as transmit:
+        async def _write(char, data, response):
+            written.append(data)
 
-            async def _transmit(*args, **kwargs):
-                pass
+        s._client = MagicMock()
+        s._client.write_gatt_char.side_effect = _write
 
-            transmit.side_effect = _transmit
-            assert (await s.loginSesame()) is None
+        assert (await s.transmit()) is None
+        assert written == [bytes.fromhex("01" + "00" * 19), bytes.fromhex("0200")]
 
     def test_CHSesameBot_onConnectionStateChange(self):
         s = CHSesameBot()
@@ -157,14 +155,16 @@ class TestCHSesameBot:
         assert s.getDeviceStatus() == CHSesame2Status.NoBleSignal
 
     @pytest.mark.asyncio
-    async def test_CHSesameBot_onCharacteristicChanged_plaintext_publish(self):
+    async def test_CHSesameBot_onCharacteristicChanged_plaintext_publish(
+        self, notify_publish_initial, mocker
+    ):
         s = CHSesameBot()
         s.setRegistered(True)
 
-        with patch("pysesameos2.chsesamebot.CHSesameBot.loginSesame") as login_sesame:
-            assert (
-                await s.onCharacteristicChanged(10, bytearray.fromhex("03080effffffff"))
-            ) is None
+        login_sesame = mocker.patch.object(CHSesameBot, "loginSesame")
+        assert (
+            await s.onCharacteristicChanged(10, bytearray(notify_publish_initial))
+        ) is None
         login_sesame.assert_called_once()
         assert s.getSesameToken().hex() == "ffffffff"
 
@@ -186,41 +186,44 @@ class TestCHSesameBot:
             )
 
     @pytest.mark.asyncio
-    async def test_CHSesameBot_onCharacteristicChanged_ciphertext_login_success(self):
+    async def test_CHSesameBot_onCharacteristicChanged_ciphertext_login_success(
+        self, notify_ciphertext, ble_cipher
+    ):
         s = CHSesameBot()
 
-        with patch("pysesameos2.crypto.BleCipher", spec=BleCipher) as ble_cipher:
-            s.setCipher(ble_cipher)
-            ble_cipher.decrypt.return_value = bytes.fromhex(
-                "07020500e845fe6000008001010a0a0a140f0000000000005503000000000004"
-            )
+        s.setCipher(ble_cipher)
+        ble_cipher.decrypt.return_value = bytes.fromhex(
+            "07020500e845fe6000008001010a0a0a140f0000000000005503000000000004"
+        )
 
-            assert (
-                await s.onCharacteristicChanged(10, bytearray.fromhex("050702"))
-            ) is None
-            assert s.getIntention() == CHSesame2Intention.idle
+        assert (
+            await s.onCharacteristicChanged(10, bytearray(notify_ciphertext))
+        ) is None
+        assert s.getIntention() == CHSesame2Intention.idle
 
     @pytest.mark.asyncio
     async def test_CHSesameBot_onGattSesamePublish_initial_with_non_registered_device(
-        self,
+        self, publish_initial
     ):
         s = CHSesameBot()
         s.setRegistered(False)
 
-        publish_payload = CHSesame2BlePublish(bytes.fromhex("0effffffff"))
+        publish_payload = CHSesame2BlePublish(publish_initial)
 
         with pytest.raises(NotImplementedError):
             await s.onGattSesamePublish(publish_payload)
 
     @pytest.mark.asyncio
-    async def test_CHSesameBot_onGattSesamePublish_initial_with_registered_device(self):
+    async def test_CHSesameBot_onGattSesamePublish_initial_with_registered_device(
+        self, publish_initial, mocker
+    ):
         s = CHSesameBot()
         s.setRegistered(True)
 
-        publish_payload = CHSesame2BlePublish(bytes.fromhex("0effffffff"))
+        publish_payload = CHSesame2BlePublish(publish_initial)
 
-        with patch("pysesameos2.chsesamebot.CHSesameBot.loginSesame") as login_sesame:
-            assert (await s.onGattSesamePublish(publish_payload)) is None
+        login_sesame = mocker.patch.object(CHSesameBot, "loginSesame")
+        assert (await s.onGattSesamePublish(publish_payload)) is None
         login_sesame.assert_called_once()
 
         assert s.getSesameToken().hex() == "ffffffff"
@@ -233,9 +236,10 @@ class TestCHSesameBot:
         publish_payload = CHSesame2BlePublish(bytes.fromhex("515503000000000102"))
 
         assert (await s.onGattSesamePublish(publish_payload)) is None
-        assert str(s.getMechStatus()) == str(
-            CHSesameBotMechStatus(rawdata="5503000000000102")
-        )
+        status = s.getMechStatus()
+        assert status.getBatteryVoltage() == 3.001759530791789
+        assert status.getMotorStatus() == 0
+        assert status.isInLockRange()
         assert s.getDeviceStatus() == CHSesame2Status.Locked
 
         assert (
@@ -252,9 +256,11 @@ class TestCHSesameBot:
         )
 
         assert (await s.onGattSesamePublish(publish_payload)) is None
-        assert str(s.getMechSetting()) == str(
-            CHSesameBotMechSettings(rawdata="010a0a0a140f000000000000")
-        )
+        setting = s.getMechSetting()
+        assert setting.getUserPrefDir() == CHSesameBotUserPreDir.reversed
+        assert setting.getLockSecConfig().getLockSec() == 10
+        assert setting.getLockSecConfig().getClickHoldSec() == 20
+        assert setting.getButtonMode() == CHSesameBotButtonMode.click
 
     @pytest.mark.asyncio
     async def test_CHSesameBot_connect_raises_exception_before_setAdvertisement(self):
@@ -321,23 +327,23 @@ class TestCHSesameBot:
             await s.toggle()
 
     @pytest.mark.asyncio
-    async def test_CHSesameBot_toggle_to_unlocking(self):
+    async def test_CHSesameBot_toggle_to_unlocking(self, mocker):
         s = CHSesameBot()
         s.setDeviceStatus(CHSesame2Status.Locked)
         s.setMechStatus(CHSesameBotMechStatus(rawdata="5503000000000102"))
 
-        with patch("pysesameos2.chsesamebot.CHSesameBot.unlock") as unlock:
-            assert (await s.toggle()) is None
+        unlock = mocker.patch.object(CHSesameBot, "unlock")
+        assert (await s.toggle()) is None
         unlock.assert_called_once()
 
     @pytest.mark.asyncio
-    async def test_CHSesameBot_toggle_to_locking(self):
+    async def test_CHSesameBot_toggle_to_locking(self, mocker):
         s = CHSesameBot()
         s.setDeviceStatus(CHSesame2Status.Unlocked)
         s.setMechStatus(CHSesameBotMechStatus(rawdata="5503000000000104"))
 
-        with patch("pysesameos2.chsesamebot.CHSesameBot.lock") as lock:
-            assert (await s.toggle()) is None
+        lock = mocker.patch.object(CHSesameBot, "lock")
+        assert (await s.toggle()) is None
         lock.assert_called_once()
 
     # TODO: Develop tests for the methods which relate to BleakClient.
@@ -6,7 +6,33 @@ import pytest
 from cryptography.hazmat.primitives import serialization
 from cryptography.hazmat.primitives.asymmetric import ec
 
-from pysesameos2.crypto import AppKey, AppKeyFactory, BleCipher
+from pysesameos2.crypto import AppKey, AppKeyFactory, BleCipher, aes_cmac
+
+
+@pytest.fixture(scope="module")
+def app_secret_key():
+    """A fixed private key to stand in for the random one of `AppKey`."""
+    return serialization.load_der_private_key(
+        bytes.fromhex(
+            "30770201010420abb8309e288941a3d0e86124f581390b90805635e27b32a2e3f094e900577b56a00a06082a8648ce3d030107a14403420004c351160b1446d96e92307bc3c05b37cf004f1b6e4e7bd712571a483b8cbd8e5e75a3b60b1aeef0fe17a7e120bf4175315f872440c27afec855c5b959fdf746d4"
+        ),
+        password=None,
+    )
+
+
+@pytest.fixture(scope="module")
+def peer_public_key():
+    """The raw public key of the device, as sent over BLE."""
+    peer_private_key = serialization.load_der_private_key(
+        bytes.fromhex(
+            "30770201010420328dde3315e0a21353ae277cb10a8c080131c2d82539788e2ce92135f635fba2a00a06082a8648ce3d030107a14403420004d422b28bafdc17a9af2a7e778aeb9f9b962da8044d16f0107ad8d2db605b0090fded0d7301fff24b3da3fe9126800be1ac046aca8144865f2e245fad32ecce5f"
+        ),
+        password=None,
+    )
+    return peer_private_key.public_key().public_bytes(
+        encoding=serialization.Encoding.DER,
+        format=serialization.PublicFormat.SubjectPublicKeyInfo,
+    )[27:]
 
 
 class TestAppKeyFactory:
@@ -37,29 +63,11 @@ class TestAppKey:
         assert len(token) == 4
         assert isinstance(token, bytes)
 
-    def test_AppKey_ecdh(self, monkeypatch):
+    def test_AppKey_ecdh(self, monkeypatch, app_secret_key, peer_public_key):
         k = AppKeyFactory.get_instance()
 
-        monkeypatch.setattr(
-            k,
-            "_secretKey",
-            bytes.fromhex(
-                "30770201010420abb8309e288941a3d0e86124f581390b90805635e27b32a2e3f094e900577b56a00a06082a8648ce3d030107a14403420004c351160b1446d96e92307bc3c05b37cf004f1b6e4e7bd712571a483b8cbd8e5e75a3b60b1aeef0fe17a7e120bf4175315f872440c27afec855c5b959fdf746d4"
-            ),
-        )
-        peer_private_key = serialization.load_der_private_key(
-            bytes.fromhex(
-                "30770201010420328dde3315e0a21353ae277cb10a8c080131c2d82539788e2ce92135f635fba2a00a06082a8648ce3d030107a14403420004d422b28bafdc17a9af2a7e778aeb9f9b962da8044d16f0107ad8d2db605b0090fded0d7301fff24b3da3fe9126800be1ac046aca8144865f2e245fad32ecce5f"
-            ),
-            password=None,
-        )
-
-        shared_key = k.ecdh(
-            peer_private_key.public_key().public_bytes(
-                encoding=serialization.Encoding.DER,
-                format=serialization.PublicFormat.SubjectPublicKeyInfo,
-            )[27:]
-        )
+        monkeypatch.setattr(k, "_secretKey", app_secret_key)
+        shared_key = k.ecdh(peer_public_key)
 
         assert (
             shared_key.hex()
@@ -79,6 +87,17 @@ class TestBleCipher:
         # OpCode=Response, CmdItCode=BleItemCode.history, CmdOPCode=BleOpCode.read, CmdResultCode=BleCmdResultCode.notFound
         assert c.decrypt(cipher_bytes=enc_payload).hex() == "07040205"
 
+    def test_BleCipher_decrypt_masks_counter(self, monkeypatch):
+        c = BleCipher(
+            session_key=bytes.fromhex("6df237e72cd41f63cf32451232bee545"),
+            session_token=bytes.fromhex("1b20262a82169bc9"),
+        )
+        # Only the lower 39 bits of the counter are a part of the nonce.
+        monkeypatch.setattr(c, "_decryptCounter", (1 << 39) + 1)
+
+        enc_payload = bytes.fromhex("56469d110effbf33")
+        assert c.decrypt(cipher_bytes=enc_payload).hex() == "07040205"
+
     def test_BleCipher_encrypt(self):
         c = BleCipher(
             session_key=bytes.fromhex("6df237e72cd41f63cf32451232bee545"),
@@ -88,3 +107,15 @@ class TestBleCipher:
         # OpCode=BleOpCode.read, ItCode=BleItemCode.history, payload=bytes([1])
         plain_payload = bytes.fromhex("020401")
         assert c.encrypt(plain_bytes=plain_payload).hex() == "fed1862150bea9"
+
+
+class TestAesCmac:
+    def test_aes_cmac(self):
+        # RFC 4493, Section 4
+        key = bytes.fromhex("2b7e151628aed2a6abf7158809cf4f3c")
+
+        assert aes_cmac(key, b"").hex() == "bb1d6929e95937287fa37d129b756746"
+        assert (
+            aes_cmac(key, bytes.fromhex("6bc1bee22e409f96e93d7e117393172a")).hex()
+            == "070a16b46b4d4144f79bdd9dd04a287c"
+        )
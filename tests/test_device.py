@@ -16,8 +16,11 @@ from pysesameos2.crypto import BleCipher
 from pysesameos2.device import CHDeviceKey, CHDevices, CHSesameLock
 from pysesameos2.helper import CHProductModel
 
+_DEVICE_ID = "42918AD1-8154-4AFF-BD1F-F0CDE88A8DE1"
+_DEVICE_UUID = uuid.UUID(_DEVICE_ID)
 
-@pytest.fixture(autouse=True)
+
+@pytest.fixture(scope="module")
 def ble_advertisement():
     bledevice = BLEDevice(
         "AA:BB:CC:11:22:33",
@@ -34,7 +37,7 @@ def ble_advertisement():
     return ble_advertisement
 
 
-@pytest.fixture(autouse=True)
+@pytest.fixture(scope="module")
 def ble_advertisement_not_registed_device():
     bledevice = BLEDevice(
         "AA:BB:CC:11:22:33",
@@ -52,20 +55,25 @@ def ble_advertisement_not_registed_device():
 
 
 class TestCHDeviceKey:
-    def test_CHDeviceKey_secretKey_raises_exception_on_invalid_value(self):
+    @pytest.mark.parametrize(
+        "setter, value, exception, message",
+        [
+            ("setSecretKey", 123, TypeError, "should be str or bytes"),
+            ("setSecretKey", "FAKE", ValueError, "non-hexadecimal number found"),
+            ("setSecretKey", "FEED", ValueError, "length should be 16"),
+            ("setSesame2PublicKey", 123, TypeError, "should be str or bytes"),
+            ("setSesame2PublicKey", "FAKE", ValueError, "non-hexadecimal number found"),
+            ("setSesame2PublicKey", "FEED", ValueError, "length should be 64"),
+        ],
+    )
+    def test_CHDeviceKey_raises_exception_on_invalid_value(
+        self, setter, value, exception, message
+    ):
         k = CHDeviceKey()
 
-        with pytest.raises(TypeError) as excinfo:
-            k.setSecretKey(123)
-        assert "should be str or bytes" in str(excinfo.value)
-
-        with pytest.raises(ValueError) as excinfo:
-            k.setSecretKey("FAKE")
-        assert "non-hexadecimal number found" in str(excinfo.value)
-
-        with pytest.raises(ValueError) as excinfo:
-            k.setSecretKey("FEED")
-        assert "length should be 16" in str(excinfo.value)
+        with pytest.raises(exception) as excinfo:
+            getattr(k, setter)(value)
+        assert message in str(excinfo.value)
 
     def test_CHDeviceKey_secretKey(self):
         k = CHDeviceKey()
@@ -81,20 +89,26 @@ class TestCHDeviceKey:
         assert k.setSecretKey(secret_str) is None
         assert k.getSecretKey() == secret_bytes
 
-    def test_CHDeviceKey_sesame2PublicKey_raises_exception_on_invalid_value(self):
+        assert k.setSecretKey(bytearray(secret_bytes)) is None
+        assert type(k.getSecretKey()) is bytes
+        assert k.getSecretKey() == secret_bytes
+
+    def test_CHDeviceKey_secretKeyCmac(self):
         k = CHDeviceKey()
 
-        with pytest.raises(TypeError) as excinfo:
-            k.setSesame2PublicKey(123)
-        assert "should be str or bytes" in str(excinfo.value)
+        assert k.getSecretKeyCmac() is None
+
+        # RFC 4493, Section 4
+        k.setSecretKey("2b7e151628aed2a6abf7158809cf4f3c")
 
-        with pytest.raises(ValueError) as excinfo:
-            k.setSesame2PublicKey("FAKE")
-        assert "non-hexadecimal number found" in str(excinfo.value)
+        c = k.getSecretKeyCmac()
+        c.update(bytes.fromhex("6bc1bee22e409f96e93d7e117393172a"))
+        assert c.finalize().hex() == "070a16b46b4d4144f79bdd9dd04a287c"
 
-        with pytest.raises(ValueError) as excinfo:
-            k.setSesame2PublicKey("FEED")
-        assert "length should be 64" in str(excinfo.value)
+        # Each call must hand out a context without any data in it.
+        assert k.getSecretKeyCmac().finalize().hex() == (
+            "bb1d6929e95937287fa37d129b756746"
+        )
 
     def test_CHDeviceKey_sesame2PublicKey(self):
         k = CHDeviceKey()
@@ -117,33 +131,37 @@ class TestCHDeviceKey:
 
 
 class TestCHDevices:
-    def test_CHDevices_deviceId_raises_exception_on_invalid_uuid(self):
+    @pytest.mark.parametrize(
+        "setter, args, exception",
+        [
+            ("setDeviceId", ("INVALID-UUID",), ValueError),
+            ("setDeviceId", (12345,), TypeError),
+            ("setProductModel", ("INVALID-PRODUCT",), TypeError),
+            ("setRssi", ("INVALID-RSSI",), TypeError),
+            ("setRssi", ("-100",), TypeError),
+            ("setDeviceStatus", (), TypeError),
+            ("setDeviceStatus", ("INVALID-DEVICE-STATUS",), TypeError),
+            ("setDeviceStatusCallback", ("INVALID-CALLBACK",), TypeError),
+            ("setAdvertisement", ("INVALID-ADV",), TypeError),
+            ("setRegistered", ("TRUE",), TypeError),
+        ],
+    )
+    def test_CHDevices_raises_exception_on_invalid_value(self, setter, args, exception):
         d = CHDevices()
 
-        with pytest.raises(ValueError):
-            d.setDeviceId("INVALID-UUID")
-
-        with pytest.raises(TypeError):
-            d.setDeviceId(12345)
+        with pytest.raises(exception):
+            getattr(d, setter)(*args)
 
     def test_CHDevices_deviceId(self):
         d = CHDevices()
 
         assert d.deviceId is None
 
-        test_uuid = "42918AD1-8154-4AFF-BD1F-F0CDE88A8DE1"
-        assert d.setDeviceId(test_uuid) is None
-        assert d.deviceId == test_uuid
-
-        test_uuid2 = uuid.UUID("42918AD1-8154-4AFF-BD1F-F0CDE88A8DE1")
-        assert d.setDeviceId(test_uuid2) is None
-        assert d.deviceId == str(test_uuid2).upper()
+        assert d.setDeviceId(_DEVICE_ID) is None
+        assert d.deviceId == _DEVICE_ID
 
-    def test_CHDevices_productModel_raises_exception_on_invalid_uuid(self):
-        d = CHDevices()
-
-        with pytest.raises(TypeError):
-            d.setProductModel("INVALID-PRODUCT")
+        assert d.setDeviceId(_DEVICE_UUID) is None
+        assert d.deviceId == str(_DEVICE_UUID).upper()
 
     def test_CHDevices_productModel(self):
         d = CHDevices()
@@ -154,15 +172,6 @@ class TestCHDevices:
         assert d.setProductModel(test_model) is None
         assert d.productModel == test_model
 
-    def test_CHDevices_rssi_raises_exception_on_invalid_value(self):
-        d = CHDevices()
-
-        with pytest.raises(TypeError):
-            d.setRssi("INVALID-RSSI")
-
-        with pytest.raises(TypeError):
-            d.setRssi("-100")
-
     def test_CHDevices_rssi(self):
         d = CHDevices()
 
@@ -171,15 +180,6 @@ class TestCHDevices:
         assert d.setRssi(10) is None
         assert d.getRssi() == 10
 
-    def test_CHDevices_device_status_raises_exception_on_invalid_value(self):
-        d = CHDevices()
-
-        with pytest.raises(TypeError):
-            d.setDeviceStatus()
-
-        with pytest.raises(TypeError):
-            d.setDeviceStatus("INVALID-DEVICE-STATUS")
-
     def test_CHDevices_device_status(self):
         d = CHDevices()
 
@@ -188,12 +188,6 @@ class TestCHDevices:
         assert d.setDeviceStatus(CHSesame2Status.Locked) is None
         assert d.getDeviceStatus() == CHSesame2Status.Locked
 
-    def test_CHDevices_device_status_callback_raises_exception_on_invalid_value(self):
-        d = CHDevices()
-
-        with pytest.raises(TypeError):
-            d.setDeviceStatusCallback("INVALID-CALLBACK")
-
     def test_CHDevices_device_status_callback_with_none(self):
         d = CHDevices()
 
@@ -221,12 +215,6 @@ class TestCHDevices:
         assert d.setDeviceStatus(CHSesame2Status.Locked) is None
         assert spy.call_count == 1
 
-    def test_CHDevices_advertisement_raises_exception_on_invalid_value(self):
-        d = CHDevices()
-
-        with pytest.raises(TypeError):
-            d.setAdvertisement("INVALID-ADV")
-
     def test_CHDevices_advertisement(self, ble_advertisement):
         d = CHDevices()
 
@@ -238,7 +226,7 @@ class TestCHDevices:
         assert d.getAdvertisement() == ble_advertisement
         assert d.productModel == CHProductModel.SS2
         assert d.getRssi() == -60
-        assert d.deviceId == "42918AD1-8154-4AFF-BD1F-F0CDE88A8DE1"
+        assert d.deviceId == _DEVICE_ID
         assert d.getRegistered()
         assert d.getDeviceStatus() == CHSesame2Status.ReceivedBle
 
@@ -251,12 +239,6 @@ class TestCHDevices:
             d.setAdvertisement(ble_advertisement_not_registed_device)
         assert "initial configuration needed" in str(excinfo.value)
 
-    def test_CHDevices_registered_raises_exception_on_invalid_value(self):
-        d = CHDevices()
-
-        with pytest.raises(TypeError):
-            d.setRegistered("TRUE")
-
     def test_CHDevices_registered(self):
         d = CHDevices()
 
@@ -274,35 +256,51 @@ class TestCHDevices:
     async def test_CHDevices_wait_for_login(self, event_loop):
         d = CHDevices()
 
-        event_loop.call_later(3, d.setDeviceStatus(CHSesame2Status.Locked))
+        # Login completes only after the waiter is already blocked on it.
+        event_loop.call_soon(d.setDeviceStatus, CHSesame2Status.Locked)
         assert await d.wait_for_login()
 
+    def test_CHDevices_login_event_follows_device_status(self):
+        d = CHDevices()
+
+        d.setDeviceStatus(CHSesame2Status.Locked)
+        assert d._login_event.is_set()
+        d.setDeviceStatus(CHSesame2Status.NoSettings)
+        assert d._login_event.is_set()
+        d.setDeviceStatus(CHSesame2Status.BleConnecting)
+        assert not d._login_event.is_set()
+
 
 class TestCHSesameLock:
-    def test_CHSesameLock_deviceUUID_raises_exception_on_invalid_uuid(self):
+    @pytest.mark.parametrize(
+        "setter, value, exception",
+        [
+            ("setDeviceUUID", "INVALID-UUID", ValueError),
+            ("setIntention", "INVALID-INTENTION", TypeError),
+            ("setCipher", "INVALID-CIPHER", TypeError),
+            ("setSesameToken", "INVALID-TOKEN", TypeError),
+            ("setCharacteristicTX", "INVALID-CHAR", TypeError),
+            ("setKey", "INVALID-KEY", TypeError),
+        ],
+    )
+    def test_CHSesameLock_raises_exception_on_invalid_value(
+        self, setter, value, exception
+    ):
         d = CHSesameLock()
 
-        with pytest.raises(ValueError):
-            d.setDeviceUUID("INVALID-UUID")
+        with pytest.raises(exception):
+            getattr(d, setter)(value)
 
     def test_CHSesameLock_deviceUUID(self):
         d = CHSesameLock()
 
         assert d.getDeviceUUID() is None
 
-        test_uuid = "42918AD1-8154-4AFF-BD1F-F0CDE88A8DE1"
-        assert d.setDeviceUUID(test_uuid) is None
-        assert d.getDeviceUUID() == test_uuid
-
-        test_uuid2 = uuid.UUID("42918AD1-8154-4AFF-BD1F-F0CDE88A8DE1")
-        assert d.setDeviceUUID(test_uuid2) is None
-        assert d.getDeviceUUID() == str(test_uuid2).upper()
-
-    def test_CHSesameLock_intention_raises_exception_on_invalid_value(self):
-        d = CHSesameLock()
+        assert d.setDeviceUUID(_DEVICE_ID) is None
+        assert d.getDeviceUUID() == _DEVICE_ID
 
-        with pytest.raises(TypeError):
-            d.setIntention("INVALID-INTENTION")
+        assert d.setDeviceUUID(_DEVICE_UUID) is None
+        assert d.getDeviceUUID() == str(_DEVICE_UUID).upper()
 
     def test_CHSesameLock_intention(self):
         d = CHSesameLock()
@@ -311,37 +309,22 @@ class TestCHSesameLock:
         assert d.setIntention(CHSesame2Intention.locking) is None
         assert d.getIntention() == CHSesame2Intention.locking
 
-    def test_CHSesameLock_cipher_raises_exception_on_invalid_value(self):
-        d = CHSesameLock()
-
-        with pytest.raises(TypeError):
-            d.setCipher("INVALID-CIPHER")
-
     def test_CHSesameLock_cipher(self):
         d = CHSesameLock()
 
         assert d.getCipher() is None
-        assert d.setCipher(BleCipher(session_key="fake", session_token="fake")) is None
+        assert (
+            d.setCipher(BleCipher(session_key=bytes(16), session_token=bytes(8)))
+            is None
+        )
         assert isinstance(d.getCipher(), BleCipher)
 
-    def test_CHSesameLock_SesameToken_raises_exception_on_invalid_value(self):
-        d = CHSesameLock()
-
-        with pytest.raises(TypeError):
-            d.setSesameToken("INVALID-TOKEN")
-
     def test_CHSesameLock_SesameToken(self):
         d = CHSesameLock()
 
         assert d.setSesameToken(b"fake") is None
         assert d.getSesameToken() == b"fake"
 
-    def test_CHSesameLock_CharacteristicTX_raises_exception_on_invalid_value(self):
-        d = CHSesameLock()
-
-        with pytest.raises(TypeError):
-            d.setCharacteristicTX("INVALID-CHAR")
-
     def test_CHSesameLock_CharacteristicTX(self):
         d = CHSesameLock()
 
@@ -354,8 +337,7 @@ class TestCHSesameLock:
     def test_CHSesameLock(self):
         d = CHSesameLock()
 
-        test_uuid = "42918AD1-8154-4AFF-BD1F-F0CDE88A8DE1"
-        assert d.setDeviceUUID(test_uuid) is None
+        assert d.setDeviceUUID(_DEVICE_ID) is None
 
         test_model = CHProductModel.SS2
         assert d.setProductModel(test_model) is None
@@ -365,12 +347,6 @@ class TestCHSesameLock:
             == "CHSesameLock(deviceUUID=42918AD1-8154-4AFF-BD1F-F0CDE88A8DE1, deviceModel=CHProductModel.SS2)"
         )
 
-    def test_CHSesameLock_key_raises_exception_on_invalid_value(self):
-        d = CHSesameLock()
-
-        with pytest.raises(TypeError):
-            d.setKey("INVALID-KEY")
-
     def test_CHSesameLock_key(self):
         d = CHSesameLock()
         k = CHDeviceKey()
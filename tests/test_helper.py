@@ -17,6 +17,21 @@ from pysesameos2.helper import (
     HistoryTagHelper,
 )
 
+_SESAME2_LOCKED = "60030080f3ff0002"
+_SESAME2_LOCKED_BYTES = bytes.fromhex(_SESAME2_LOCKED)
+_SESAME2_MECH_SETTING_BYTES = bytes.fromhex("efff1c0159ff85008600b201")
+_BOT_LOCKED = "5503000000000102"
+_BOT_LOCKED_BYTES = bytes.fromhex(_BOT_LOCKED)
+_BOT_MECH_SETTING = "010a0a0a140f000000000000"
+_BOT_MECH_SETTING_BYTES = bytes.fromhex(_BOT_MECH_SETTING)
+# 26 bytes cut the 9th character in half, so both sizes give the same chunks.
+_SPLIT_TEXT_BYTES = "適当に 分割すると最後の文字が壊れてしまう".encode("utf-8")
+_SPLIT_CHUNKS = (
+    "適当に 分割すると".encode("utf-8"),
+    "最後の文字が壊れ".encode("utf-8"),
+    "てしまう".encode("utf-8"),
+)
+
 
 class TestCHProductModel:
     def test_CHProductModel_raises_exception_on_invalid_model(self):
@@ -69,33 +84,28 @@ class TestCHProductModel:
 
 
 class TestCHSesameProtocolMechStatus:
-    def test_CHSesameProtocolMechStatus_raises_exception_on_emtry_arguments(self):
-        with pytest.raises(TypeError):
-            CHSesameProtocolMechStatus()
-
-    def test_CHSesameProtocolMechStatus_raises_exception_on_non_string_argument(self):
+    @pytest.mark.parametrize("args", [(), (10,)])
+    def test_CHSesameProtocolMechStatus_raises_exception_on_invalid_arguments(
+        self, args
+    ):
         with pytest.raises(TypeError):
-            CHSesameProtocolMechStatus(10)
-
-    def test_CHSesameProtocolMechStatus(self):
-        status = CHSesameProtocolMechStatus(rawdata="60030080f3ff0002")
-        assert status.isInLockRange()
+            CHSesameProtocolMechStatus(*args)
 
-        status = CHSesameProtocolMechStatus(rawdata=bytes.fromhex("60030080f3ff0002"))
+    @pytest.mark.parametrize("rawdata", [_SESAME2_LOCKED, _SESAME2_LOCKED_BYTES])
+    def test_CHSesameProtocolMechStatus(self, rawdata):
+        status = CHSesameProtocolMechStatus(rawdata=rawdata)
         assert status.isInLockRange()
 
 
 class TestCHSesame2MechStatus:
-    def test_CHSesame2MechStatus_raises_exception_on_emtry_arguments(self):
-        with pytest.raises(TypeError):
-            CHSesame2MechStatus()
-
-    def test_CHSesame2MechStatus_raises_exception_on_non_string_argument(self):
+    @pytest.mark.parametrize("args", [(), (10,)])
+    def test_CHSesame2MechStatus_raises_exception_on_invalid_arguments(self, args):
         with pytest.raises(TypeError):
-            CHSesame2MechStatus(10)
+            CHSesame2MechStatus(*args)
 
-    def test_CHSesame2MechStatus_rawdata_locked(self):
-        status = CHSesame2MechStatus(rawdata="60030080f3ff0002")
+    @pytest.mark.parametrize("rawdata", [_SESAME2_LOCKED, _SESAME2_LOCKED_BYTES])
+    def test_CHSesame2MechStatus_rawdata_locked(self, rawdata):
+        status = CHSesame2MechStatus(rawdata=rawdata)
 
         assert status.getBatteryPercentage() == 100.0
         assert status.getBatteryVoltage() == 6.0809384164222875
@@ -109,12 +119,6 @@ class TestCHSesame2MechStatus:
             == "CHSesame2MechStatus(Battery=100% (6.08V), isInLockRange=True, isInUnlockRange=False, Position=-13)"
         )
 
-        status = CHSesame2MechStatus(rawdata=bytes.fromhex("60030080f3ff0002"))
-        assert (
-            str(status)
-            == "CHSesame2MechStatus(Battery=100% (6.08V), isInLockRange=True, isInUnlockRange=False, Position=-13)"
-        )
-
     def test_CHSesame2MechStatus_rawdata_unlocked(self):
         status = CHSesame2MechStatus(rawdata="5c030503e3020004")
 
@@ -125,10 +129,6 @@ class TestCHSesame2MechStatus:
         assert status.getTarget() == 773
         assert not status.isInLockRange()
         assert status.isInUnlockRange()
-        assert (
-            str(status)
-            == "CHSesame2MechStatus(Battery=100% (6.05V), isInLockRange=False, isInUnlockRange=True, Position=739)"
-        )
 
     def test_CHSesame2MechStatus_rawdata_lowpower(self):
         status = CHSesame2MechStatus(rawdata="30030080f3ff0002")
@@ -138,6 +138,25 @@ class TestCHSesame2MechStatus:
         status2 = CHSesame2MechStatus(rawdata="48020080f3ff0002")
         assert status2.getBatteryPercentage() == 0
 
+    def test_CHSesame2MechStatus_accepts_memoryview(self):
+        data = b"\xff" + _SESAME2_LOCKED_BYTES
+        status = CHSesame2MechStatus(rawdata=memoryview(data)[1:])
+
+        assert status.getBatteryVoltage() == 6.0809384164222875
+        assert status.getPosition() == -13
+        assert status.isInLockRange()
+
+    def test_CHSesame2MechStatus_battery_interpolation(self):
+        assert (
+            CHSesame2MechStatus(rawdata="c0020080f3ff0002").getBatteryPercentage() == 6
+        )
+        assert (
+            CHSesame2MechStatus(rawdata="f0020080f3ff0002").getBatteryPercentage() == 16
+        )
+        assert (
+            CHSesame2MechStatus(rawdata="20030080f3ff0002").getBatteryPercentage() == 34
+        )
+
     def test_CHSesame2MechStatus_getBatteryPrecentage_provides_backward_compatibility(
         self,
     ):
@@ -146,18 +165,13 @@ class TestCHSesame2MechStatus:
 
 
 class TestCHSesame2MechSettings:
-    def test_CHSesame2MechSettings_raises_exception_on_emtry_arguments(self):
-        with pytest.raises(TypeError):
-            CHSesame2MechSettings()
-
-    def test_CHSesame2MechSettings_raises_exception_on_non_string_argument(self):
+    @pytest.mark.parametrize("args", [(), (10,)])
+    def test_CHSesame2MechSettings_raises_exception_on_invalid_arguments(self, args):
         with pytest.raises(TypeError):
-            CHSesame2MechSettings(10)
+            CHSesame2MechSettings(*args)
 
     def test_CHSesame2MechSettings(self):
-        setting = CHSesame2MechSettings(
-            rawdata=bytes.fromhex("efff1c0159ff85008600b201")
-        )
+        setting = CHSesame2MechSettings(rawdata=_SESAME2_MECH_SETTING_BYTES)
 
         assert setting.isConfigured is True
         assert setting.getLockPosition() == -17
@@ -169,16 +183,14 @@ class TestCHSesame2MechSettings:
 
 
 class TestCHSesameBotMechStatus:
-    def test_CHSesameBotMechStatus_raises_exception_on_emtry_arguments(self):
+    @pytest.mark.parametrize("args", [(), (10,)])
+    def test_CHSesameBotMechStatus_raises_exception_on_invalid_arguments(self, args):
         with pytest.raises(TypeError):
-            CHSesameBotMechStatus()
+            CHSesameBotMechStatus(*args)
 
-    def test_CHSesameBotMechStatus_raises_exception_on_non_string_argument(self):
-        with pytest.raises(TypeError):
-            CHSesameBotMechStatus(10)
-
-    def test_CHSesameBotMechStatus_rawdata_locked(self):
-        status = CHSesameBotMechStatus(rawdata="5503000000000102")
+    @pytest.mark.parametrize("rawdata", [_BOT_LOCKED, _BOT_LOCKED_BYTES])
+    def test_CHSesameBotMechStatus_rawdata_locked(self, rawdata):
+        status = CHSesameBotMechStatus(rawdata=rawdata)
 
         assert status.getBatteryPercentage() == 100.0
         assert status.getBatteryVoltage() == 3.001759530791789
@@ -189,11 +201,6 @@ class TestCHSesameBotMechStatus:
             str(status) == "CHSesameBotMechStatus(Battery=100% (3.00V), motorStatus=0)"
         )
 
-        status = CHSesameBotMechStatus(rawdata=bytes.fromhex("5503000000000102"))
-        assert (
-            str(status) == "CHSesameBotMechStatus(Battery=100% (3.00V), motorStatus=0)"
-        )
-
     def test_CHSesameBotMechStatus_rawdata_unlocked(self):
         status = CHSesameBotMechStatus(rawdata="5503000000000104")
 
@@ -202,9 +209,6 @@ class TestCHSesameBotMechStatus:
         assert not status.isInLockRange()
         assert status.isInUnlockRange()
         assert status.getMotorStatus() == 0
-        assert (
-            str(status) == "CHSesameBotMechStatus(Battery=100% (3.00V), motorStatus=0)"
-        )
 
     def test_CHSesameBotMechStatus_rawdata_lowpower(self):
         status = CHSesameBotMechStatus(rawdata="3003000000000102")
@@ -223,45 +227,50 @@ class TestCHSesameBotMechStatus:
 
 
 class TestCHSesameBotMechSettings:
-    def test_CHSesameBotMechSettings_raises_exception_on_emtry_arguments(self):
-        with pytest.raises(TypeError):
-            CHSesameBotMechSettings()
-
-    def test_CHSesameBotMechSettings_raises_exception_on_non_string_argument(self):
+    @pytest.mark.parametrize("args", [(), (10,)])
+    def test_CHSesameBotMechSettings_raises_exception_on_invalid_arguments(self, args):
         with pytest.raises(TypeError):
-            CHSesameBotMechSettings(10)
+            CHSesameBotMechSettings(*args)
 
     def test_CHSesameBotMechSettings(self):
-        setting = CHSesameBotMechSettings(
-            rawdata=bytes.fromhex("010a0a0a140f000000000000")
-        )
+        setting = CHSesameBotMechSettings(rawdata=_BOT_MECH_SETTING_BYTES)
 
         assert setting.getUserPrefDir() == CHSesameBotUserPreDir.reversed
+        assert setting.getUserPrefDir().value == bytes([1])
         assert setting.getLockSecConfig().getLockSec() == 10
         assert setting.getLockSecConfig().getUnlockSec() == 10
         assert setting.getLockSecConfig().getClickLockSec() == 10
         assert setting.getLockSecConfig().getClickHoldSec() == 20
         assert setting.getLockSecConfig().getClickUnlockSec() == 15
         assert setting.getButtonMode() == CHSesameBotButtonMode.click
+        assert setting.getButtonMode().value == bytes([0])
 
         assert (
             str(setting)
             == "CHSesameBotMechSettings(userPrefDir=CHSesameBotUserPreDir.reversed, lockSec=10, unlockSec=10, clickLockSec=10, clickHoldSec=20, clickUnlockSec=15, buttonMode=CHSesameBotButtonMode.click)"
         )
 
+    def test_CHSesameBotMechSettings_raises_exception_on_unknown_mode(self):
+        with pytest.raises(ValueError):
+            CHSesameBotMechSettings(rawdata="020a0a0a140f000000000000")
+        with pytest.raises(ValueError):
+            CHSesameBotMechSettings(rawdata="010a0a0a140f020000000000")
 
-class TestCHSesameBotLockSecondsConfiguration:
-    def test_CHSesameBotLockSecondsConfiguration_raises_exception_on_emtry_arguments(
-        self,
-    ):
-        with pytest.raises(TypeError):
-            CHSesameBotLockSecondsConfiguration()
+    def test_CHSesameBotMechSettings_accepts_memoryview(self):
+        setting = CHSesameBotMechSettings(rawdata=memoryview(_BOT_MECH_SETTING_BYTES))
 
-    def test_CHSesameBotLockSecondsConfiguration_raises_exception_on_non_string_argument(
-        self,
+        assert setting.getUserPrefDir() == CHSesameBotUserPreDir.reversed
+        assert setting.getLockSecConfig().getClickHoldSec() == 20
+        assert setting.getButtonMode() == CHSesameBotButtonMode.click
+
+
+class TestCHSesameBotLockSecondsConfiguration:
+    @pytest.mark.parametrize("args", [(), (10,)])
+    def test_CHSesameBotLockSecondsConfiguration_raises_exception_on_invalid_arguments(
+        self, args
     ):
         with pytest.raises(TypeError):
-            CHSesameBotLockSecondsConfiguration(10)
+            CHSesameBotLockSecondsConfiguration(*args)
 
     def test_CHSesameBotLockSecondsConfiguration(self):
         c = CHSesameBotLockSecondsConfiguration(rawdata="0a0a0a140f")
@@ -275,28 +284,25 @@ class TestCHSesameBotLockSecondsConfiguration:
 
 class TestHistoryTagHelper:
     def test_split_utf8(self):
-        text_bytes = "適当に 分割すると最後の文字が壊れてしまう".encode("utf-8")
-
-        assert text_bytes[:25].decode("utf-8") == "適当に 分割すると"
+        assert _SPLIT_TEXT_BYTES[:25].decode("utf-8") == "適当に 分割すると"
 
         with pytest.raises(UnicodeDecodeError) as excinfo:
-            text_bytes[:26].decode("utf-8")
+            _SPLIT_TEXT_BYTES[:26].decode("utf-8")
         assert "unexpected end of data" in str(excinfo.value)
 
-        test_25 = HistoryTagHelper.split_utf8(text_bytes, 25)
-        test_26 = HistoryTagHelper.split_utf8(text_bytes, 26)
-
-        desired_split = [
-            "適当に 分割すると".encode("utf-8"),
-            "最後の文字が壊れ".encode("utf-8"),
-            "てしまう".encode("utf-8"),
-        ]
-
-        assert list(test_25) == desired_split
-        assert list(test_26) == desired_split
+        assert (
+            tuple(HistoryTagHelper.split_utf8(_SPLIT_TEXT_BYTES, 25)) == _SPLIT_CHUNKS
+        )
+        assert (
+            tuple(HistoryTagHelper.split_utf8(_SPLIT_TEXT_BYTES, 26)) == _SPLIT_CHUNKS
+        )
 
     def test_create_htag(self):
         assert (
             HistoryTagHelper.create_htag(history_tag="適当な日本語で OK")
             == b"\x15\xe9\x81\xa9\xe5\xbd\x93\xe3\x81\xaa\xe6\x97\xa5\xe6\x9c\xac\xe8\xaa\x9e\xe3\x81\xa7"
         )
+
+    def test_create_htag_pads_short_tag(self):
+        assert HistoryTagHelper.create_htag(history_tag="OK") == b"\x02OK" + bytes(19)
+        assert HistoryTagHelper.create_htag(history_tag="") == bytes(22)